@@ -0,0 +1,141 @@
+"""Extraction benchmark for the archive backends in libs/install.py.
+
+Generates DLC-shaped archives of .package files (stored and deflated zip,
+plus 7z when py7zr is installed) and extracts each one with every backend
+that can read it, reporting throughput and peak memory. Each run happens in
+a fresh process so peak RSS is not polluted by earlier runs.
+
+    python benchmarks/archive_bench.py --size-mb 512 --files 40
+"""
+import sys
+import time
+import shutil
+import zipfile
+import argparse
+import tempfile
+import threading
+import tracemalloc
+import multiprocessing
+from pathlib import Path
+from random import Random
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from libs.install import ARCHIVE_BACKENDS, ArchiveBackend, py7zr
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+MB = 1024 * 1024
+
+
+def generate_archives(root: Path, size_mb: int, files: int, seed: int = 7) -> List[Path]:
+    rng = Random(seed)
+    block = rng.randbytes(4 * MB)
+    payload = root / "payload" / "The.Sims.4.Bench" / "EP01"
+    payload.mkdir(parents=True)
+    per_file = max(1, size_mb * MB // files)
+    for i in range(files):
+        with (payload / f"ClientFullBuild{i}.package").open('wb') as f:
+            remaining = per_file
+            while remaining > 0:
+                chunk = block[:min(len(block), remaining)]
+                f.write(chunk)
+                remaining -= len(chunk)
+
+    archives = []
+    for label, method in (('stored', zipfile.ZIP_STORED), ('deflated', zipfile.ZIP_DEFLATED)):
+        path = root / f"Sims4_EP01_{label}.zip"
+        with zipfile.ZipFile(path, 'w', method, compresslevel=1 if method == zipfile.ZIP_DEFLATED else None) as z:
+            for item in sorted(payload.rglob('*')):
+                z.write(item, item.relative_to(payload.parent.parent))
+        archives.append(path)
+    if py7zr is not None:
+        path = root / "Sims4_EP01.7z"
+        with py7zr.SevenZipFile(path, 'w') as z:
+            z.writeall(payload.parent, payload.parent.name)
+        archives.append(path)
+    shutil.rmtree(root / "payload")
+    return archives
+
+
+def _measure(backend: ArchiveBackend, archive: Path, target: Path, results) -> None:
+    peak = [psutil.Process().memory_info().rss if psutil else 0]
+    stop = threading.Event()
+
+    def sample():
+        process = psutil.Process()
+        while not stop.wait(0.01):
+            peak[0] = max(peak[0], process.memory_info().rss)
+
+    sampler = threading.Thread(target=sample, daemon=True) if psutil else None
+    if sampler:
+        sampler.start()
+    else:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        with backend.open(archive) as reader:
+            reader.extract_all(target)
+        elapsed = time.perf_counter() - started
+    except Exception as e:
+        results.put({'error': str(e)})
+        return
+    finally:
+        stop.set()
+    if sampler:
+        sampler.join()
+        memory = peak[0]
+    else:
+        memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    written = sum(p.stat().st_size for p in target.rglob('*') if p.is_file())
+    results.put({'elapsed': elapsed, 'bytes': written, 'memory': memory, 'rss': sampler is not None})
+
+
+def run(backend: ArchiveBackend, archive: Path, target: Path) -> Dict:
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    proc = ctx.Process(target=_measure, args=(backend, archive, target, results))
+    proc.start()
+    result = results.get()
+    proc.join()
+    shutil.rmtree(target, ignore_errors=True)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=int, default=256, help="uncompressed payload per archive")
+    parser.add_argument('--files', type=int, default=40)
+    parser.add_argument('--workdir', type=Path, default=None)
+    args = parser.parse_args()
+
+    root = args.workdir or Path(tempfile.mkdtemp(prefix="archive_bench_"))
+    try:
+        archives = generate_archives(root, args.size_mb, args.files)
+        for archive in archives:
+            print(f"\n{archive.name} ({archive.stat().st_size / MB:.0f} MB)")
+            for backend in ARCHIVE_BACKENDS:
+                if archive.suffix not in backend.extensions:
+                    continue
+                if not backend.available():
+                    print(f"  {backend.name:8} not installed")
+                    continue
+                result = run(backend, archive, root / f"out_{backend.name}")
+                if 'error' in result:
+                    print(f"  {backend.name:8} failed: {result['error']}")
+                    continue
+                kind = "peak rss" if result['rss'] else "peak py heap"
+                print(f"  {backend.name:8} {result['elapsed']:6.2f}s  {result['bytes'] / MB / result['elapsed']:8.1f} MB/s  "
+                      f"{kind} {result['memory'] / MB:6.1f} MB")
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
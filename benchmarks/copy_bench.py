@@ -0,0 +1,104 @@
+"""Benchmark for CopyEngine against shutil.copytree on a synthetic DLC tree.
+
+Builds a Delta-shaped tree (many small .package files plus a few large
+ones, as in a full install) and copies it with shutil.copytree, with
+CopyEngine.transfer, and moves it with CopyEngine.transfer(move=True),
+which is a rename when source and target share a volume.
+
+    python benchmarks/copy_bench.py --small 2000 --large 4 --large-mb 256
+"""
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+from random import Random
+from typing import List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from libs.install import CopyEngine, CopyProgress
+from libs.utils import format_bytes, format_speed, format_eta
+
+MB = 1024 * 1024
+
+
+def build_tree(root: Path, small: int, large: int, large_mb: int, seed: int = 11) -> int:
+    rng = Random(seed)
+    block = rng.randbytes(4 * MB)
+    codes = [f"EP{i:02d}" for i in range(1, 21)] + [f"SP{i:02d}" for i in range(1, 41)]
+    total = 0
+
+    def write(path: Path, size: int) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open('wb') as f:
+            remaining = size
+            while remaining > 0:
+                chunk = block[:min(len(block), remaining)]
+                f.write(chunk)
+                remaining -= len(chunk)
+
+    for i in range(small):
+        size = rng.choice((4, 16, 64, 256, 1024, 4096)) * 1024
+        write(root / codes[i % len(codes)] / f"Strings{i}.package", size)
+        total += size
+    for i in range(large):
+        size = large_mb * MB
+        write(root / codes[i % len(codes)] / f"ClientFullBuild{i}.package", size)
+        total += size
+    return total
+
+
+def pairs_for(src: Path, dst: Path) -> List[Tuple[Path, Path]]:
+    return [(path, dst / path.relative_to(src)) for path in src.rglob('*') if path.is_file()]
+
+
+def report(label: str, seconds: float, total: int) -> None:
+    print(f"  {label:16} {seconds:7.2f}s  {format_speed(total / seconds if seconds else 0):>14}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--small', type=int, default=2000)
+    parser.add_argument('--large', type=int, default=4)
+    parser.add_argument('--large-mb', type=int, default=256)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--workdir', type=Path, default=None)
+    args = parser.parse_args()
+
+    if args.workdir:
+        args.workdir.mkdir(parents=True, exist_ok=True)
+    root = Path(tempfile.mkdtemp(prefix="copy_bench_", dir=args.workdir))
+    try:
+        source = root / "source"
+        total = build_tree(source, args.small, args.large, args.large_mb)
+        print(f"tree: {args.small} small + {args.large} large files, {format_bytes(total)}")
+        engine = CopyEngine(workers=args.workers)
+
+        started = time.perf_counter()
+        shutil.copytree(source, root / "copytree")
+        report("copytree", time.perf_counter() - started, total)
+        shutil.rmtree(root / "copytree")
+
+        last = [None]
+
+        def progress(p: CopyProgress) -> None:
+            last[0] = p
+
+        started = time.perf_counter()
+        engine.transfer(pairs_for(source, root / "engine"), on_progress=progress)
+        report("engine copy", time.perf_counter() - started, total)
+        if last[0]:
+            print(f"  {'':16} last tick: {last[0].files}/{last[0].total_files} files, "
+                  f"{format_speed(last[0].rate)}, eta {format_eta(last[0].eta)}")
+
+        started = time.perf_counter()
+        engine.transfer(pairs_for(root / "engine", root / "moved"), move=True)
+        report("engine move", time.perf_counter() - started, total)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark for InstallerManager._find_dlc_folders on synthetic extracted trees.
+
+Builds trees of roughly --entries files shaped like extracted DLC archives
+(release folder, a few DLC folders full of .package files, plus noise
+folders) and times the scandir detector against a working copy of the
+previous rglob-based implementation.
+
+    python benchmarks/dlc_scan_bench.py --entries 10000 --repeat 5
+"""
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+from random import Random
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from libs.install import InstallerManager
+
+
+def legacy_find_dlc_folders(installer: InstallerManager, root_path: Path) -> List[Path]:
+    """The old per-depth rglob loop, made runnable.
+
+    The original passed '*' * depth to rglob, which raises ValueError for
+    '***' (already on 3.11); this keeps its cost, a full rglob per depth, but
+    keeps only the entries at that depth.
+    """
+    dlc_folders = []
+    for depth in range(4):
+        if depth == 0:
+            items = [root_path] if root_path.exists() else []
+        else:
+            items = [item for item in root_path.rglob('*') if len(item.relative_to(root_path).parts) == depth]
+        for item in items:
+            if item.is_dir() and installer._is_dlc_folder(item.name):
+                if any(f.suffix == '.package' for f in item.iterdir() if f.is_file()):
+                    dlc_folders.append(item)
+    return dlc_folders
+
+
+def build_tree(root: Path, entries: int, dlc_count: int, seed: int = 13) -> None:
+    rng = Random(seed)
+    release = root / "The.Sims.4.Bundle-RELEASE"
+    codes = [f"EP{i:02d}" for i in range(1, 21)] + [f"GP{i:02d}" for i in range(1, 13)] + [f"SP{i:02d}" for i in range(1, 75)]
+    folders = [release / "Delta" / code for code in rng.sample(codes, dlc_count)]
+    folders += [release / "Support" / f"noise{i}" / "nested" for i in range(dlc_count)]
+    for folder in folders:
+        folder.mkdir(parents=True, exist_ok=True)
+    for i in range(entries):
+        folder = folders[i % len(folders)]
+        sub = folder / f"sub{i % 7}" if i % 5 == 0 else folder
+        sub.mkdir(exist_ok=True)
+        (sub / f"file{i}.package").touch()
+
+
+def bench(label: str, func, root: Path, repeat: int) -> List[Path]:
+    timings = []
+    result: List[Path] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        try:
+            result = func(root)
+        except Exception as e:
+            print(f"{label:8} failed: {e}")
+            return []
+        timings.append(time.perf_counter() - started)
+    unique = len(set(result))
+    print(f"{label:8} best {min(timings) * 1000:8.1f} ms  mean {sum(timings) / len(timings) * 1000:8.1f} ms  "
+          f"found {len(result)} ({unique} unique)")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=10000)
+    parser.add_argument('--dlcs', type=int, default=12)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    installer = InstallerManager()
+    root = Path(tempfile.mkdtemp(prefix="dlc_scan_"))
+    try:
+        build_tree(root, args.entries, args.dlcs)
+        print(f"tree: {args.entries} files, {args.dlcs} DLC folders")
+        new = bench("scandir", installer._find_dlc_folders, root, args.repeat)
+        old = bench("rglob", lambda r: legacy_find_dlc_folders(installer, r), root, args.repeat)
+        if old and set(old) != set(new):
+            print("WARNING: detectors disagree")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
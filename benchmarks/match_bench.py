@@ -0,0 +1,215 @@
+"""Accuracy and speed benchmark for DLC filename matching.
+
+Builds a labelled corpus from locales.json (scene-style release names,
+Polish names, code-only names and non-DLC noise) plus the recorded file
+list in match_corpus.json, then runs every matcher over it and reports
+precision/recall against the expected DLC code, per-call latency and
+throughput over --size filenames.
+
+A matcher is any class constructed as cls(locales_path, language) with a
+match_code(filename) method; the default is libs.locale:LocaleManager.
+Thresholds can be overridden to see what a change would cost, and
+--min-precision/--min-recall turn the run into a regression check.
+
+    python benchmarks/match_bench.py --size 10000
+    python benchmarks/match_bench.py --name-threshold 0.7 --min-recall 0.9
+    python benchmarks/match_bench.py --matcher libs.locale:LocaleManager --matcher mymatch:Matcher
+"""
+import sys
+import json
+import time
+import argparse
+import importlib
+import unicodedata
+from pathlib import Path
+from random import Random
+from statistics import median
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import libs.locale
+
+LOCALES_FILE = Path(__file__).resolve().parent.parent / "locales.json"
+RECORDED_FILE = Path(__file__).resolve().parent / "match_corpus.json"
+EXTENSIONS = ('.zip', '.rar', '.7z', '')
+GROUPS = ('CODEX', 'RELOADED', 'EMPRESS', 'FitGirl', 'ElAmigos', 'DODI', 'anadius')
+NOISE_WORDS = ('setup', 'readme', 'crack', 'update', 'installer', 'redist', 'language', 'patch', 'bonus',
+               'soundtrack', 'wallpaper', 'manual', 'config', 'launcher', 'directx', 'vcredist', 'origin')
+NOISE_EXTENSIONS = ('.exe', '.txt', '.nfo', '.dll', '.ini', '.rtf', '.mp4', '.bin', '.zip', '.rar')
+
+Sample = Tuple[str, str, Optional[str]]
+
+
+def _ascii(text: str) -> str:
+    return unicodedata.normalize('NFKD', text.replace('ł', 'l').replace('Ł', 'L')).encode('ascii', 'ignore').decode()
+
+
+def _scene(name: str, rng: Random) -> str:
+    words = name.replace(':', '').replace('™', '').split()
+    style = rng.randrange(4)
+    if style == 0:
+        return f"The.Sims.4.{'.'.join(words)}-{rng.choice(GROUPS)}"
+    if style == 1:
+        return f"Sims4_{'_'.join(words)}"
+    if style == 2:
+        return f"The Sims 4 - {' '.join(words)} [{rng.choice(GROUPS)}]"
+    return '.'.join(words).lower()
+
+
+def _polish(name: str, rng: Random) -> str:
+    style = rng.randrange(4)
+    if style == 0:
+        return name
+    if style == 1:
+        return _ascii(name)
+    if style == 2:
+        return name.replace(' ', '_')
+    return f"The Sims 4 {name}"
+
+
+def _code(code: str, name: str, rng: Random) -> str:
+    style = rng.randrange(4)
+    if style == 0:
+        return f"Sims4_{code}"
+    if style == 1:
+        return f"{code.lower()}-{name.replace(' ', '.')}"
+    if style == 2:
+        return f"{code} {name}"
+    return f"[{code}]"
+
+
+def _noise(rng: Random) -> str:
+    words = rng.sample(NOISE_WORDS, rng.randint(1, 3))
+    if rng.random() < 0.3:
+        words.append(f"v{rng.randint(1, 9)}.{rng.randint(0, 99)}")
+    return rng.choice(('_', ' ', '.', '-')).join(words) + rng.choice(NOISE_EXTENSIONS)
+
+
+def build_corpus(mods: Dict, size: int, seed: int = 17) -> List[Sample]:
+    """Return at least --size unique (kind, filename, expected code) samples."""
+    rng = Random(seed)
+    recorded = json.loads(RECORDED_FILE.read_text(encoding='utf-8'))['samples']
+    corpus: Dict[str, Sample] = {name: ('recorded', name, code) for name, code in recorded}
+    codes = list(mods)
+    attempts = 0
+    while len(corpus) < size and attempts < size * 20:
+        attempts += 1
+        kind = rng.choice(('scene', 'polish', 'code', 'noise'))
+        if kind == 'noise':
+            name, code = _noise(rng), None
+        else:
+            code = rng.choice(codes)
+            info = mods[code]
+            if kind == 'scene':
+                name = _scene(info.get('en', ''), rng)
+            elif kind == 'polish':
+                name = _polish(info.get('pl') or info.get('en', ''), rng)
+            else:
+                name = _code(code, info.get('en', ''), rng)
+            if attempts > len(codes) * 8:
+                name = f"{name}.part{rng.randint(1, 99)}" if rng.random() < 0.5 else f"{name} (v{rng.randint(1, 40)})"
+            name += rng.choice(EXTENSIONS)
+        corpus.setdefault(name, (kind, name, code))
+    return list(corpus.values())
+
+
+def load_matcher(spec: str):
+    module_name, _, attr = spec.partition(':')
+    return getattr(importlib.import_module(module_name), attr or 'LocaleManager')
+
+
+def score(corpus: List[Sample], predictions: List[Optional[str]]) -> Dict[str, Tuple[Optional[float], Optional[float], int]]:
+    """Precision and recall per sample kind, plus an 'all' row; None where nothing was predicted or expected."""
+    totals: Dict[str, List[int]] = {}
+    for (kind, _, expected), got in zip(corpus, predictions):
+        for key in (kind, 'all'):
+            row = totals.setdefault(key, [0, 0, 0, 0])
+            row[0] += 1
+            row[1] += got is not None
+            row[2] += expected is not None
+            row[3] += got is not None and got == expected
+    result = {}
+    for key, (count, predicted, relevant, correct) in totals.items():
+        precision = correct / predicted if predicted else None
+        recall = correct / relevant if relevant else None
+        result[key] = (precision, recall, count)
+    return result
+
+
+def _percent(value: Optional[float]) -> str:
+    return f"{value:6.1%}" if value is not None else f"{'-':>6}"
+
+
+def bench(label: str, cls, corpus: List[Sample], language: str, show: int) -> Dict[str, Tuple[Optional[float], Optional[float], int]]:
+    started = time.perf_counter()
+    matcher = cls(LOCALES_FILE, language)
+    setup = time.perf_counter() - started
+
+    latencies = []
+    predictions = []
+    for _, name, _ in corpus:
+        started = time.perf_counter()
+        predictions.append(matcher.match_code(name))
+        latencies.append(time.perf_counter() - started)
+    cold = sum(latencies)
+
+    started = time.perf_counter()
+    for _, name, _ in corpus:
+        matcher.match_code(name)
+    warm = time.perf_counter() - started
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95)]
+    print(f"\n{label}")
+    print(f"  setup {setup * 1000:.1f} ms, {len(corpus)} names: cold {cold:.2f}s ({len(corpus) / cold:,.0f}/s), "
+          f"repeat {warm:.3f}s ({len(corpus) / warm:,.0f}/s)")
+    print(f"  per call: median {median(latencies) * 1e6:.0f} us, p95 {p95 * 1e6:.0f} us, max {latencies[-1] * 1e3:.1f} ms")
+
+    results = score(corpus, predictions)
+    for kind in ('recorded', 'scene', 'polish', 'code', 'noise', 'all'):
+        if kind in results:
+            precision, recall, count = results[kind]
+            print(f"  {kind:9} {count:6}  precision {_percent(precision)}  recall {_percent(recall)}")
+    if show:
+        misses = [(name, expected, got) for (_, name, expected), got in zip(corpus, predictions) if got != expected]
+        for name, expected, got in misses[:show]:
+            print(f"    {name!r}: expected {expected}, got {got}")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=10000, help="number of unique filenames")
+    parser.add_argument('--seed', type=int, default=17)
+    parser.add_argument('--language', default='en')
+    parser.add_argument('--matcher', action='append', help="module:Class, may be repeated")
+    parser.add_argument('--name-threshold', type=float, default=None)
+    parser.add_argument('--substring-threshold', type=float, default=None)
+    parser.add_argument('--show-misses', type=int, default=0, metavar='N')
+    parser.add_argument('--min-precision', type=float, default=None)
+    parser.add_argument('--min-recall', type=float, default=None)
+    args = parser.parse_args()
+
+    if args.name_threshold is not None:
+        libs.locale.NAME_THRESHOLD = args.name_threshold
+    if args.substring_threshold is not None:
+        libs.locale.SUBSTRING_THRESHOLD = args.substring_threshold
+    print(f"thresholds: name {libs.locale.NAME_THRESHOLD}, substring {libs.locale.SUBSTRING_THRESHOLD}")
+
+    mods = json.loads(LOCALES_FILE.read_text(encoding='utf-8')).get('mods', {})
+    corpus = build_corpus(mods, args.size, args.seed)
+    failed = False
+    for spec in args.matcher or ['libs.locale:LocaleManager']:
+        precision, recall, _ = bench(spec, load_matcher(spec), corpus, args.language, args.show_misses)['all']
+        if args.min_precision is not None and (precision or 0.0) < args.min_precision:
+            print(f"  FAIL: precision {precision:.1%} below {args.min_precision:.1%}")
+            failed = True
+        if args.min_recall is not None and (recall or 0.0) < args.min_recall:
+            print(f"  FAIL: recall {recall:.1%} below {args.min_recall:.1%}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+"""Local-swarm throughput benchmark for TorrentManager.
+
+Generates a synthetic multi-file torrent shaped like the DLC torrents in
+source/, seeds it from N libtorrent sessions on loopback behind a local
+HTTP tracker and downloads it through TorrentManager once per settings
+profile.
+
+    python benchmarks/torrent_bench.py --files 24 --scale 0.05 --seeds 3
+    python benchmarks/torrent_bench.py --ttfp --tracker-delay 5
+"""
+import sys
+import time
+import shutil
+import asyncio
+import argparse
+import threading
+import multiprocessing
+from pathlib import Path
+from random import Random
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socket import inet_aton
+from struct import pack
+from urllib.parse import urlsplit, parse_qs
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import libtorrent as lt
+from libs.torrent import TorrentManager, TorrentFile
+from libs.locale import LocaleManager
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+LOCALES_FILE = Path(__file__).resolve().parent.parent / "locales.json"
+MB = 1024 * 1024
+
+LOOPBACK = {
+    'enable_dht': False,
+    'enable_lsd': False,
+    'enable_upnp': False,
+    'enable_natpmp': False,
+    'allow_multiple_connections_per_ip': True,
+    'listen_interfaces': '127.0.0.1:0',
+}
+
+class Tracker:
+    __slots__ = ('_server', '_thread', '_peers', 'delay')
+
+    def __init__(self):
+        self._peers: Dict[bytes, Dict[bytes, bytes]] = {}
+        self.delay = 0.0
+        peers = self._peers
+        tracker = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = parse_qs(urlsplit(self.path).query, encoding='latin-1')
+                info_hash = query['info_hash'][0].encode('latin-1')
+                peer_id = query['peer_id'][0].encode('latin-1')
+                swarm = peers.setdefault(info_hash, {})
+                if query.get('event', [''])[0] == 'stopped':
+                    swarm.pop(peer_id, None)
+                else:
+                    time.sleep(tracker.delay)
+                    swarm[peer_id] = inet_aton('127.0.0.1') + pack('>H', int(query['port'][0]))
+                others = b''.join(v for k, v in swarm.items() if k != peer_id)
+                body = lt.bencode({'interval': 30, 'min interval': 5, 'peers': others})
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/announce"
+
+    def close(self) -> None:
+        self._server.shutdown()
+
+
+def generate_payload(root: Path, count: int, scale: float, seed: int = 4) -> None:
+    rng = Random(seed)
+    block = rng.randbytes(4 * MB)
+    codes = [f"{prefix}{n:02d}" for prefix, n in
+             [('EP', i) for i in range(1, 21)] + [('GP', i) for i in range(1, 13)] + [('SP', i) for i in range(1, 75)]]
+    root.mkdir(parents=True, exist_ok=True)
+    for code in codes[:count]:
+        size = max(MB, int(rng.randint(100, 2048) * MB * scale))
+        with (root / f"Sims4_{code}.zip").open('wb') as f:
+            remaining = size
+            while remaining > 0:
+                chunk = block[:min(len(block), remaining)]
+                f.write(chunk)
+                remaining -= len(chunk)
+
+
+def make_torrent(root: Path, tracker_url: str, target: Path) -> Path:
+    fs = lt.file_storage()
+    lt.add_files(fs, str(root))
+    ct = lt.create_torrent(fs, 4 * MB)
+    ct.add_tracker(tracker_url)
+    lt.set_piece_hashes(ct, str(root.parent))
+    target.mkdir(parents=True, exist_ok=True)
+    path = target / f"{root.name}.torrent"
+    path.write_bytes(lt.bencode(ct.generate()))
+    return path
+
+
+def seed(torrent: str, save_path: str, ready, stop) -> None:
+    session = lt.session(dict(LOOPBACK, alert_mask=0))
+    params = lt.add_torrent_params()
+    params.ti = lt.torrent_info(torrent)
+    params.save_path = save_path
+    params.flags |= lt.torrent_flags.seed_mode
+    session.add_torrent(params)
+    ready.set()
+    stop.wait()
+
+
+class BenchManager(TorrentManager):
+    __slots__ = ()
+    SETTINGS = dict(TorrentManager.SETTINGS, **LOOPBACK)
+    DHT_ROUTERS = ()
+
+
+def _rss() -> Optional[int]:
+    return psutil.Process().memory_info().rss if psutil else None
+
+
+async def _download(mgr: TorrentManager, files: List[TorrentFile], window: Optional[int], timeout: float) -> Dict:
+    queue = mgr.engine.subscribe()
+    started = time.perf_counter()
+    cpu = time.process_time()
+    peers_found = await mgr.start_download_async(files, window)
+    pending = {f.global_idx for f in files}
+    first_peer = first_byte = None
+    completed: Dict[int, float] = {}
+    peak_rss = _rss()
+
+    while pending:
+        event = await asyncio.wait_for(queue.get(), timeout)
+        if event is None:
+            break
+        now = time.perf_counter() - started
+        if first_peer is None and peers_found.done():
+            first_peer = now
+        if first_byte is None and any(event.progress.values()):
+            first_byte = now
+        for idx in event.completed:
+            completed.setdefault(idx, now)
+            pending.discard(idx)
+        rss = _rss()
+        if rss and rss > (peak_rss or 0):
+            peak_rss = rss
+
+    elapsed = time.perf_counter() - started
+    total = sum(f.size for f in files)
+    return {
+        'elapsed': elapsed,
+        'throughput': total / elapsed if elapsed > 0 else 0,
+        'first_peer': first_peer,
+        'first_byte': first_byte,
+        'completed': completed,
+        'cpu': time.process_time() - cpu,
+        'peak_rss': peak_rss,
+    }
+
+
+def run_profile(profile: str, auto_tune: bool, torrent_dir: Path, download_dir: Path, window: Optional[int], timeout: float):
+    mgr = BenchManager(torrent_dir, download_dir, profile=profile, auto_tune=auto_tune)
+    mgr.init_session()
+    try:
+        mgr.load_torrents(LocaleManager(LOCALES_FILE))
+        files = list(mgr.files)
+        return asyncio.run(_download(mgr, files, window, timeout)), files
+    finally:
+        mgr.shutdown()
+
+
+def time_to_first_peer(tracker: Tracker, torrent_dir: Path, download_dir: Path, delay: float, timeout: float) -> Dict[str, float]:
+    """Time to first peer without and then with the saved session state.
+
+    Both runs see a tracker that takes `delay` seconds to answer, standing in
+    for a slow or unreachable one, so the warm run only beats it through the
+    peers cached by the cold run.
+    """
+    results = {}
+    shutil.rmtree(download_dir, ignore_errors=True)
+    tracker.delay = delay
+    for label in ('cold', 'warm'):
+        mgr = BenchManager(torrent_dir, download_dir)
+        mgr.init_session()
+        try:
+            mgr.load_torrents(LocaleManager(LOCALES_FILE))
+
+            async def first_peer():
+                started = time.perf_counter()
+                peers_found = await mgr.start_download_async(list(mgr.files[:1]))
+                await asyncio.wait_for(peers_found, timeout)
+                return time.perf_counter() - started
+
+            results[label] = asyncio.run(first_peer())
+            mgr.stop()
+        finally:
+            mgr.shutdown()
+        for path in download_dir.iterdir():
+            if path.name == '.session':
+                continue
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink()
+    return results
+
+
+def _report(name: str, result: Dict, files: List[TorrentFile]) -> None:
+    def fmt(value):
+        return f"{value:.2f}s" if value is not None else "n/a"
+    print(f"\n[{name}]")
+    print(f"  elapsed        {result['elapsed']:.2f}s")
+    print(f"  throughput     {result['throughput'] / MB:.1f} MB/s")
+    print(f"  first peer     {fmt(result['first_peer'])}")
+    print(f"  first byte     {fmt(result['first_byte'])}")
+    print(f"  cpu            {result['cpu']:.2f}s")
+    print(f"  peak rss       {result['peak_rss'] / MB:.0f} MB" if result['peak_rss'] else "  peak rss       n/a (psutil missing)")
+    by_idx = {f.global_idx: f for f in files}
+    for idx, at in sorted(result['completed'].items(), key=lambda item: item[1]):
+        print(f"    {at:7.2f}s  {by_idx[idx].size / MB:7.0f} MB  {by_idx[idx].name}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workdir', type=Path, default=Path('bench_swarm'))
+    parser.add_argument('--files', type=int, default=24)
+    parser.add_argument('--scale', type=float, default=0.05, help="multiplier on the 100 MB-2 GB file sizes")
+    parser.add_argument('--seeds', type=int, default=3)
+    parser.add_argument('--profiles', default=','.join(TorrentManager.PROFILES))
+    parser.add_argument('--auto-tune', action='store_true', help="also run every profile with the auto-tuner enabled")
+    parser.add_argument('--window', type=int, default=None, help="FileScheduler window (0 = auto, default: all files)")
+    parser.add_argument('--timeout', type=float, default=60.0, help="seconds without progress before giving up")
+    parser.add_argument('--ttfp', action='store_true', help="measure cold vs warm time-to-first-peer instead")
+    parser.add_argument('--tracker-delay', type=float, default=5.0, help="seconds the tracker stalls announces during --ttfp")
+    args = parser.parse_args()
+
+    payload = args.workdir / "seed" / "The.Sims.4.Bench"
+    torrent_dir = args.workdir / "source"
+    tracker = Tracker()
+    if not payload.exists():
+        generate_payload(payload, args.files, args.scale)
+    shutil.rmtree(torrent_dir, ignore_errors=True)
+    torrent = make_torrent(payload, tracker.url, torrent_dir)
+
+    ctx = multiprocessing.get_context('spawn')
+    stop = ctx.Event()
+    seeders = []
+    for _ in range(args.seeds):
+        ready = ctx.Event()
+        proc = ctx.Process(target=seed, args=(str(torrent), str(payload.parent), ready, stop), daemon=True)
+        proc.start()
+        ready.wait(30)
+        seeders.append(proc)
+
+    try:
+        if args.ttfp:
+            ttfp = time_to_first_peer(tracker, torrent_dir, args.workdir / "ttfp", args.tracker_delay, args.timeout)
+            for label, seconds in ttfp.items():
+                print(f"{label:5} time to first peer: {seconds * 1000:.0f} ms")
+            return
+        for name in args.profiles.split(','):
+            for auto_tune in ((False, True) if args.auto_tune else (False,)):
+                label = f"{name}+auto" if auto_tune else name
+                download_dir = args.workdir / f"download_{label}"
+                shutil.rmtree(download_dir, ignore_errors=True)
+                result, files = run_profile(name, auto_tune, torrent_dir, download_dir, args.window, args.timeout)
+                _report(label, result, files)
+    finally:
+        stop.set()
+        for proc in seeders:
+            proc.join(5)
+        tracker.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,578 @@
+import os
+import sys
+import time
+import errno
 import shutil
 import re
-import aspose.zip as az
+import json
+import uuid
+import zlib
+import struct
+import zipfile
+import threading
+import importlib.util
 import winreg
+from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Tuple, List, Optional
+from collections import deque, defaultdict
+from dataclasses import dataclass, field
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Tuple, List, Optional, Dict, FrozenSet, TYPE_CHECKING
+from libs.utils import format_bytes
 
 TEMP_EXTRACT_DIR = Path("temp_extract")
 ARCHIVE_EXTENSIONS = frozenset({'.zip', '.rar', '.7z'})
 DLC_PATTERN = re.compile(r'^(EP|GP|SP|FP)(\d{2})$', re.IGNORECASE)
+MEMBER_SEPARATOR = re.compile(r'[\\/]')
+MAX_DLC_DEPTH = 3
+STAGING_PREFIX = ".staging-"
+OLD_PREFIX = ".old-"
+COPY_BUFFER = 8 * 1024 * 1024
+ZIP_METHODS = frozenset({zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED, zipfile.ZIP_BZIP2, zipfile.ZIP_LZMA})
+MANIFEST_NAME = ".manifest.json"
+MANIFEST_VERSION = 1
+VERIFY_WORKERS = 4
+LEGACY_MARKERS = ("magalog.package", "thumbnails.package")
+LARGE_FILE = 64 * 1024 * 1024
+COPY_WORKERS = 8
+DISK_RESERVE = 512 * 1024 * 1024
+UNPACK_RATIO = 1.05
+PROGRESS_INTERVAL = 0.25
+
+if TYPE_CHECKING:
+    from libs.torrent import TorrentFile
+
+try:
+    import py7zr
+except ImportError:
+    py7zr = None
+
+try:
+    import rarfile
+except ImportError:
+    rarfile = None
+
+ProgressCallback = Callable[[int, int, Optional['CopyProgress']], None]
+
+
+@dataclass(frozen=True, slots=True)
+class InstallProgress:
+    job_id: int
+    path: Path
+    done: int
+    total: int
+    rate: float = 0.0
+    eta: Optional[float] = None
+
+
+class InstallCancelled(Exception):
+    pass
+
+
+class UnsupportedArchive(Exception):
+    pass
+
+
+@dataclass(frozen=True, slots=True)
+class ManifestEntry:
+    size: int
+    mtime_ns: int
+    crc: int
+
+
+@dataclass(frozen=True, slots=True)
+class ArchiveDlc:
+    code: str
+    folder: str
+    files: int
+    size: int
+    installed: bool
+
+
+@dataclass(frozen=True, slots=True)
+class PlanStep:
+    file: 'TorrentFile'
+    path: Optional[Path]
+    source: int
+    unpacked: int
+    replaced: int
+    streaming: bool
+    
+    @property
+    def net(self) -> int:
+        return self.unpacked - self.replaced - self.source
+
+
+@dataclass(frozen=True, slots=True)
+class InstallPlan:
+    steps: Tuple[PlanStep, ...]
+    peak: Dict[str, int]
+    limits: Dict[str, int]
+    fits: bool
+    reason: str = ""
+    claim: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass(frozen=True, slots=True)
+class VerifyResult:
+    code: str
+    checked: int
+    missing: Tuple[str, ...]
+    corrupt: Tuple[str, ...]
+    
+    @property
+    def ok(self) -> bool:
+        return not self.missing and not self.corrupt
+
+
+@dataclass(slots=True)
+class InstallJob:
+    job_id: int
+    path: Path
+    future: Optional[Future] = None
+    cancelled: threading.Event = field(default_factory=threading.Event)
+    
+    def cancel(self) -> None:
+        self.cancelled.set()
+        if self.future:
+            self.future.cancel()
+
+
+def _crc32(path: str) -> int:
+    crc = 0
+    buffer = memoryview(bytearray(COPY_BUFFER))
+    with open(path, 'rb', buffering=0) as f:
+        while read := f.readinto(buffer):
+            crc = zlib.crc32(buffer[:read], crc)
+    return crc
+
+
+def _copy_range(src, offset: int, length: int, out) -> None:
+    if hasattr(os, 'copy_file_range'):
+        try:
+            while length:
+                copied = os.copy_file_range(src.fileno(), out.fileno(), length, offset)
+                if not copied:
+                    raise EOFError("Archive member is truncated")
+                offset += copied
+                length -= copied
+            return
+        except OSError:
+            pass
+    if sys.platform.startswith('linux'):
+        try:
+            while length:
+                sent = os.sendfile(out.fileno(), src.fileno(), offset, length)
+                if not sent:
+                    raise EOFError("Archive member is truncated")
+                offset += sent
+                length -= sent
+            return
+        except OSError:
+            pass
+    src.seek(offset)
+    buffer = memoryview(bytearray(min(COPY_BUFFER, length) or 1))
+    while length:
+        read = src.readinto(buffer[:min(len(buffer), length)])
+        if not read:
+            raise EOFError("Archive member is truncated")
+        out.write(buffer[:read])
+        length -= read
+
+
+def _copy_file(src: Path, dst: Path) -> int:
+    with open(src, 'rb', buffering=0) as fin, open(dst, 'wb', buffering=0) as fout:
+        size = os.fstat(fin.fileno()).st_size
+        _copy_range(fin, 0, size, fout)
+    return size
+
+
+@dataclass(frozen=True, slots=True)
+class CopyProgress:
+    files: int
+    total_files: int
+    done: int
+    total: int
+    elapsed: float
+    
+    @property
+    def rate(self) -> float:
+        return self.done / self.elapsed if self.elapsed > 0 else 0.0
+    
+    @property
+    def eta(self) -> float:
+        rate = self.rate
+        return (self.total - self.done) / rate if rate > 0 else float("inf")
+
+
+class CopyEngine:
+    __slots__ = ('workers', 'large_file')
+    
+    def __init__(self, workers: int = COPY_WORKERS, large_file: int = LARGE_FILE):
+        self.workers = workers
+        self.large_file = large_file
+    
+    def copy_file(self, src: Path, dst: Path) -> int:
+        return _copy_file(src, dst)
+    
+    def move_file(self, src: Path, dst: Path) -> int:
+        size = os.stat(src).st_size
+        try:
+            os.replace(src, dst)
+            return size
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+        _copy_file(src, dst)
+        os.unlink(src)
+        return size
+    
+    def transfer(self, pairs: List[Tuple[Path, Path]], move: bool = False,
+                 on_file: Optional[Callable[[Path], None]] = None,
+                 on_progress: Optional[Callable[[CopyProgress], None]] = None) -> CopyProgress:
+        sizes = [os.stat(src).st_size for src, _ in pairs]
+        total = sum(sizes)
+        lock = threading.Lock()
+        done = [0, 0]
+        started = time.perf_counter()
+        action = self.move_file if move else self.copy_file
+        
+        def run(src: Path, dst: Path, size: int) -> None:
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            action(src, dst)
+            with lock:
+                done[0] += 1
+                done[1] += size
+                if on_file:
+                    on_file(dst)
+                if on_progress:
+                    on_progress(CopyProgress(done[0], len(pairs), done[1], total, time.perf_counter() - started))
+        
+        jobs = sorted(zip(pairs, sizes), key=lambda job: job[1], reverse=True)
+        large = [job for job in jobs if job[1] >= self.large_file]
+        small = [job for job in jobs if job[1] < self.large_file]
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="copy") as pool:
+            futures = [pool.submit(run, src, dst, size) for (src, dst), size in small]
+            for (src, dst), size in large:
+                run(src, dst, size)
+            for future in futures:
+                future.result()
+        return CopyProgress(done[0], len(pairs), done[1], total, time.perf_counter() - started)
+
+
+class ArchiveReader(ABC):
+    __slots__ = ()
+    streaming = True
+    
+    @property
+    @abstractmethod
+    def entries(self) -> List:
+        ...
+    
+    def extract_all(self, target: Path) -> None:
+        self.extract_members(self.entries, target)
+    
+    def extract_members(self, entries: List, target: Path) -> None:
+        for entry in entries:
+            if entry.is_directory:
+                continue
+            dest = target.joinpath(*[part for part in MEMBER_SEPARATOR.split(entry.name) if part not in ('', '.', '..')])
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            entry.extract(str(dest))
+    
+    def close(self) -> None:
+        pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class _ZipMember:
+    __slots__ = ('_reader', '_info', 'name', 'is_directory', 'size', 'crc')
+    
+    def __init__(self, reader: '_ZipReader', info: zipfile.ZipInfo):
+        self._reader = reader
+        self._info = info
+        self.name = info.filename
+        self.is_directory = info.is_dir()
+        self.size = info.file_size
+        self.crc = info.CRC
+    
+    def extract(self, path: str) -> None:
+        self._reader.copy_member(self._info, path)
+
+
+class _ZipReader(ArchiveReader):
+    __slots__ = ('_zip', '_raw', '_entries')
+    
+    def __init__(self, path: Path):
+        self._zip = zipfile.ZipFile(path)
+        infos = self._zip.infolist()
+        unsupported = {info.compress_type for info in infos} - ZIP_METHODS
+        if unsupported or any(info.flag_bits & 0x1 for info in infos):
+            self._zip.close()
+            raise UnsupportedArchive(f"zipfile cannot read methods {sorted(unsupported)} or encrypted members")
+        self._raw = open(path, 'rb', buffering=0)
+        self._entries = [_ZipMember(self, info) for info in infos]
+    
+    @property
+    def entries(self) -> List[_ZipMember]:
+        return self._entries
+    
+    def _data_offset(self, info: zipfile.ZipInfo) -> int:
+        self._raw.seek(info.header_offset)
+        header = self._raw.read(zipfile.sizeFileHeader)
+        if len(header) != zipfile.sizeFileHeader or header[:4] != zipfile.stringFileHeader:
+            raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+        name_length, extra_length = struct.unpack('<HH', header[26:30])
+        return info.header_offset + zipfile.sizeFileHeader + name_length + extra_length
+    
+    def copy_member(self, info: zipfile.ZipInfo, path: str) -> None:
+        with open(path, 'wb', buffering=0) as out:
+            if info.compress_type == zipfile.ZIP_STORED:
+                _copy_range(self._raw, self._data_offset(info), info.file_size, out)
+            else:
+                with self._zip.open(info) as src:
+                    shutil.copyfileobj(src, out, COPY_BUFFER)
+    
+    def close(self) -> None:
+        self._raw.close()
+        self._zip.close()
+
+
+class _RarMember:
+    __slots__ = ('_rar', '_info', 'name', 'is_directory', 'size', 'crc')
+    
+    def __init__(self, rar, info):
+        self._rar = rar
+        self._info = info
+        self.name = info.filename
+        self.is_directory = info.is_dir()
+        self.size = info.file_size
+        self.crc = info.CRC
+    
+    def extract(self, path: str) -> None:
+        with self._rar.open(self._info) as src, open(path, 'wb') as out:
+            shutil.copyfileobj(src, out, COPY_BUFFER)
+
+
+class _RarReader(ArchiveReader):
+    __slots__ = ('_rar', '_entries')
+    
+    def __init__(self, path: Path):
+        self._rar = rarfile.RarFile(str(path))
+        self._entries = [_RarMember(self._rar, info) for info in self._rar.infolist()]
+    
+    @property
+    def entries(self) -> List[_RarMember]:
+        return self._entries
+    
+    def close(self) -> None:
+        self._rar.close()
+
+
+class _SevenZipMember:
+    __slots__ = ('_reader', 'name', 'is_directory', 'size', 'crc')
+    
+    def __init__(self, reader: '_SevenZipReader', info):
+        self._reader = reader
+        self.name = info.filename
+        self.is_directory = info.is_directory
+        self.size = info.uncompressed
+        self.crc = info.crc32
+    
+    def extract(self, path: str) -> None:
+        self._reader.extract_member(self.name, Path(path))
+
+
+class _SevenZipReader(ArchiveReader):
+    __slots__ = ('_archive', '_entries')
+    streaming = False
+    
+    def __init__(self, path: Path):
+        self._archive = py7zr.SevenZipFile(str(path), 'r')
+        self._entries = [_SevenZipMember(self, info) for info in self._archive.list()]
+    
+    @property
+    def entries(self) -> List[_SevenZipMember]:
+        return self._entries
+    
+    def extract_member(self, name: str, path: Path) -> None:
+        scratch = path.parent / f"{STAGING_PREFIX}{uuid.uuid4().hex}"
+        try:
+            self._archive.reset()
+            self._archive.extract(path=str(scratch), targets=[name])
+            os.replace(scratch.joinpath(*MEMBER_SEPARATOR.split(name)), path)
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+    
+    def extract_all(self, target: Path) -> None:
+        self._archive.reset()
+        self._archive.extractall(path=str(target))
+    
+    def extract_members(self, entries: List[_SevenZipMember], target: Path) -> None:
+        self._archive.reset()
+        self._archive.extract(path=str(target), targets=[entry.name for entry in entries])
+    
+    def close(self) -> None:
+        self._archive.close()
+
+
+class _AsposeMember:
+    __slots__ = ('_entry', 'name', 'is_directory', 'size', 'crc')
+    
+    def __init__(self, entry):
+        self._entry = entry
+        self.name = entry.name
+        self.is_directory = entry.is_directory
+        self.size = getattr(entry, 'uncompressed_size', 0) or 0
+        self.crc = None
+    
+    def extract(self, path: str) -> None:
+        self._entry.extract(path)
+
+
+class _AsposeReader(ArchiveReader):
+    __slots__ = ('_archive', '_entries', 'streaming')
+    
+    def __init__(self, archive, streaming: bool):
+        self._archive = archive
+        self._entries = None
+        self.streaming = streaming
+    
+    @property
+    def entries(self) -> List[_AsposeMember]:
+        if self._entries is None:
+            self._entries = [_AsposeMember(entry) for entry in self._archive.entries]
+        return self._entries
+    
+    def extract_all(self, target: Path) -> None:
+        self._archive.extract_to_directory(str(target))
+    
+    def extract_members(self, entries: List[_AsposeMember], target: Path) -> None:
+        if self.streaming:
+            super().extract_members(entries, target)
+        else:
+            self.extract_all(target)
+    
+    def close(self) -> None:
+        self._archive.__exit__(None, None, None)
+
+
+class _LocalMember:
+    __slots__ = ('path', 'name', 'is_directory', 'size', '_crc')
+    
+    def __init__(self, path: Path, name: str):
+        self.path = path
+        self.name = name
+        self.is_directory = False
+        self.size = path.stat().st_size
+        self._crc = None
+    
+    @property
+    def crc(self) -> int:
+        if self._crc is None:
+            self._crc = _crc32(str(self.path))
+        return self._crc
+    
+    def extract(self, path: str) -> None:
+        _copy_file(self.path, Path(path))
+
+
+class ArchiveBackend(ABC):
+    __slots__ = ()
+    name = ''
+    extensions: frozenset = frozenset()
+    
+    def available(self) -> bool:
+        return True
+    
+    @abstractmethod
+    def open(self, path: Path) -> ArchiveReader:
+        ...
+
+
+class ZipfileBackend(ArchiveBackend):
+    __slots__ = ()
+    name = 'zipfile'
+    extensions = frozenset({'.zip'})
+    
+    def open(self, path: Path) -> ArchiveReader:
+        return _ZipReader(path)
+
+
+class RarfileBackend(ArchiveBackend):
+    __slots__ = ()
+    name = 'rarfile'
+    extensions = frozenset({'.rar'})
+    
+    def available(self) -> bool:
+        if rarfile is None:
+            return False
+        try:
+            rarfile.tool_setup()
+            return True
+        except rarfile.RarCannotExec:
+            return False
+    
+    def open(self, path: Path) -> ArchiveReader:
+        return _RarReader(path)
+
+
+class SevenZipBackend(ArchiveBackend):
+    __slots__ = ()
+    name = 'py7zr'
+    extensions = frozenset({'.7z'})
+    
+    def available(self) -> bool:
+        return py7zr is not None
+    
+    def open(self, path: Path) -> ArchiveReader:
+        return _SevenZipReader(path)
+
+
+class AsposeBackend(ArchiveBackend):
+    __slots__ = ()
+    name = 'aspose'
+    extensions = ARCHIVE_EXTENSIONS
+    
+    def available(self) -> bool:
+        try:
+            return importlib.util.find_spec('aspose.zip') is not None
+        except ImportError:
+            return False
+    
+    def open(self, path: Path) -> ArchiveReader:
+        import aspose.zip as az
+        ext = path.suffix.lower()
+        if ext == '.zip':
+            archive = az.Archive(str(path))
+        elif ext == '.rar':
+            archive = az.rar.RarArchive(str(path))
+        else:
+            archive = az.sevenzip.SevenZipArchive(str(path))
+        return _AsposeReader(archive.__enter__(), streaming=ext == '.zip')
+
+
+ARCHIVE_BACKENDS: Tuple[ArchiveBackend, ...] = (ZipfileBackend(), RarfileBackend(), SevenZipBackend(), AsposeBackend())
 
 
 class InstallerManager:
-    __slots__ = ('delta_path',)
+    __slots__ = ('delta_path', 'backends', 'copier', '_locks', '_locks_guard')
     
-    def __init__(self):
+    def __init__(self, backends: Optional[List[ArchiveBackend]] = None, copier: Optional[CopyEngine] = None):
         self.delta_path: Optional[Path] = None
-        TEMP_EXTRACT_DIR.mkdir(exist_ok=True)
+        self.backends = list(backends or ARCHIVE_BACKENDS)
+        self.copier = copier or CopyEngine()
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+    
+    def _folder_lock(self, code: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(code, threading.Lock())
     
     def auto_detect_game_path(self) -> Tuple[bool, str]:
         try:
@@ -25,6 +582,7 @@ class InstallerManager:
             if path.parent.exists():
                 self.delta_path = path
                 path.mkdir(exist_ok=True)
+                self.recover_staging()
                 return True, install_dir
         except OSError:
             pass
@@ -40,6 +598,7 @@ class InstallerManager:
             if path.exists():
                 self.delta_path = path / "Delta"
                 self.delta_path.mkdir(exist_ok=True)
+                self.recover_staging()
                 return True, str(path)
         
         return False, "Game not found"
@@ -56,6 +615,7 @@ class InstallerManager:
         path = Path(game_path) / "Delta"
         if path.exists() and path.is_dir():
             self.delta_path = path
+            self.recover_staging()
             return True
         
         game_path_obj = Path(game_path)
@@ -63,6 +623,7 @@ class InstallerManager:
             try:
                 path.mkdir(exist_ok=True)
                 self.delta_path = path
+                self.recover_staging()
                 return True
             except Exception:
                 pass
@@ -73,44 +634,514 @@ class InstallerManager:
     def _is_dlc_folder(self, folder_name: str) -> bool:
         return bool(DLC_PATTERN.match(folder_name))
     
+    def _has_package(self, folder: str) -> bool:
+        try:
+            with os.scandir(folder) as entries:
+                return any(e.name.lower().endswith('.package') and e.is_file() for e in entries)
+        except OSError:
+            return False
+    
     def _find_dlc_folders(self, root_path: Path) -> List[Path]:
+        if not root_path.is_dir():
+            return []
+        if self._is_dlc_folder(root_path.name) and self._has_package(str(root_path)):
+            return [root_path]
         dlc_folders = []
-        for depth in range(4):
-            items = [root_path] if depth == 0 and root_path.exists() else list(root_path.rglob('*' * depth))
-            for item in items:
-                if item.is_dir() and self._is_dlc_folder(item.name):
-                    if any(f.suffix == '.package' for f in item.iterdir() if f.is_file()):
-                        dlc_folders.append(item)
+        pending = deque([(str(root_path), 0)])
+        while pending:
+            folder, depth = pending.popleft()
+            try:
+                with os.scandir(folder) as it:
+                    subdirs = [e for e in it if e.is_dir(follow_symlinks=False)]
+            except OSError:
+                continue
+            for entry in subdirs:
+                if self._is_dlc_folder(entry.name) and self._has_package(entry.path):
+                    dlc_folders.append(Path(entry.path))
+                elif depth < MAX_DLC_DEPTH:
+                    pending.append((entry.path, depth + 1))
         return dlc_folders
     
-    def _extract_archive(self, archive_path: Path) -> Tuple[bool, str]:
-        self._cleanup_temp()
-        TEMP_EXTRACT_DIR.mkdir(exist_ok=True)
+    def _open_archive(self, archive_path: Path) -> ArchiveReader:
         ext = archive_path.suffix.lower()
-        target = str(TEMP_EXTRACT_DIR)
-        
-        try:
-            if ext == '.zip':
-                with az.Archive(str(archive_path)) as archive:
-                    archive.extract_to_directory(target)
-            elif ext == '.rar':
-                with az.rar.RarArchive(str(archive_path)) as rar:
-                    rar.extract_to_directory(target)
-            elif ext == '.7z':
-                with az.sevenzip.SevenZipArchive(str(archive_path)) as seven:
-                    seven.extract_to_directory(target)
+        errors = []
+        for backend in self.backends:
+            if ext not in backend.extensions or not backend.available():
+                continue
+            try:
+                return backend.open(archive_path)
+            except Exception as e:
+                errors.append(f"{backend.name}: {e}")
+        raise ValueError("; ".join(errors) if errors else f"Unsupported: {ext}")
+    
+    def _dlc_member(self, name: str) -> Optional[Tuple[str, str]]:
+        parts = [part for part in MEMBER_SEPARATOR.split(name) if part not in ('', '.')]
+        if any(part == '..' or ':' in part for part in parts):
+            return None
+        for depth, part in enumerate(parts[:MAX_DLC_DEPTH + 1]):
+            if self._is_dlc_folder(part):
+                return part, '/'.join(parts[depth + 1:])
+        return None
+    
+    def _group_members(self, archive) -> Dict[str, Tuple[str, List]]:
+        groups: Dict[str, Tuple[str, List]] = {}
+        for entry in archive.entries:
+            if entry.is_directory:
+                continue
+            member = self._dlc_member(entry.name)
+            if not member or not member[1]:
+                continue
+            folder, rel = member
+            groups.setdefault(folder.upper(), (folder, []))[1].append((rel, entry))
+        return {
+            code: group for code, group in groups.items()
+            if any('/' not in rel and rel.lower().endswith('.package') for rel, _ in group[1])
+        }
+    
+    def _stream_archive(self, archive_path: Path, job_dir: Path,
+                        progress: Optional[ProgressCallback] = None) -> Tuple[bool, str, List[str]]:
+        with self._open_archive(archive_path) as archive:
+            if archive.streaming:
+                return self._stream_members(archive, progress)
+        return self._install_extracted(archive_path, job_dir, progress)
+    
+    def _stream_members(self, archive: ArchiveReader, progress: Optional[ProgressCallback] = None) -> Tuple[bool, str, List[str]]:
+        groups = self._group_members(archive)
+        if not groups:
+            return False, "No DLC folders in archive", []
+        tick = self._progress_ticker(sum(len(entries) for _, entries in groups.values()), progress)
+        rewritten = 0
+        skipped = 0
+        for code, (folder, entries) in groups.items():
+            with self._folder_lock(code):
+                if self._group_current(folder, entries):
+                    skipped += 1
+                    for _ in entries:
+                        tick()
+                    continue
+                rewritten += self._install_group(folder, entries, tick)
+        return True, f"Installed {len(groups) - skipped} DLC(s), {skipped} up to date, {rewritten} file(s) written", list(groups)
+    
+    def _group_current(self, folder: str, members: List[Tuple[str, object]]) -> bool:
+        if not self.delta_path or not members:
+            return False
+        dest = self.delta_path / folder
+        manifest = self.read_manifest(dest)
+        if manifest:
+            return (manifest.keys() == {rel for rel, _ in members}
+                    and all(self._reusable(dest, rel, manifest[rel], member, frozenset()) for rel, member in members))
+        for rel, member in members:
+            try:
+                if os.stat(dest / rel).st_size != member.size:
+                    return False
+            except OSError:
+                return False
+        return True
+    
+    def list_archive(self, archive_path: Path) -> List[ArchiveDlc]:
+        with self._open_archive(archive_path) as archive:
+            groups = self._group_members(archive)
+            return [
+                ArchiveDlc(code, folder, len(entries), sum(entry.size for _, entry in entries), self._group_current(folder, entries))
+                for code, (folder, entries) in groups.items()
+            ]
+    
+    def _progress_ticker(self, total: int, progress: Optional[ProgressCallback]) -> Callable[..., None]:
+        done = 0
+        reported = -1
+        last = 0.0
+        
+        def tick(copy: Optional[CopyProgress] = None) -> None:
+            nonlocal done, reported, last
+            done += 1
+            if not progress:
+                return
+            percent = done * 100 // total if total else 100
+            now = time.monotonic()
+            if percent == reported and done != total and now - last < PROGRESS_INTERVAL:
+                return
+            reported, last = percent, now
+            progress(done, total, copy)
+        return tick
+    
+    def read_manifest(self, folder: Path) -> Dict[str, ManifestEntry]:
+        try:
+            data = json.loads((folder / MANIFEST_NAME).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+        if data.get('version') != MANIFEST_VERSION:
+            return {}
+        return {rel: ManifestEntry(*row) for rel, row in data['files'].items()}
+    
+    def _write_manifest(self, folder: Path, entries: Dict[str, ManifestEntry]) -> None:
+        files = {rel: [entry.size, entry.mtime_ns, entry.crc] for rel, entry in entries.items()}
+        (folder / MANIFEST_NAME).write_text(json.dumps({'version': MANIFEST_VERSION, 'files': files}), encoding='utf-8')
+    
+    def _reusable(self, dest: Path, rel: str, known: Optional[ManifestEntry], member, verified: FrozenSet[str]) -> bool:
+        if known is None or known.size != member.size:
+            return False
+        if member.crc is None:
+            if rel not in verified:
+                return False
+        elif member.crc != known.crc:
+            return False
+        if rel in verified:
+            return True
+        try:
+            stat = os.stat(dest / rel)
+        except OSError:
+            return False
+        return stat.st_size == known.size and stat.st_mtime_ns == known.mtime_ns
+    
+    def _install_group(self, folder: str, members: List[Tuple[str, object]], tick: Callable[..., None],
+                       verified: FrozenSet[str] = frozenset()) -> int:
+        dest = self.delta_path / folder
+        staging = self.delta_path / f"{STAGING_PREFIX}{folder}"
+        manifest = self.read_manifest(dest)
+        if staging.exists():
+            shutil.rmtree(staging, ignore_errors=True)
+        written: Dict[str, ManifestEntry] = {}
+        pending = []
+        copies = []
+        root = staging.resolve()
+        try:
+            for rel, member in members:
+                target = staging / rel
+                if not target.resolve().is_relative_to(root):
+                    raise ValueError(f"Unsafe archive member: {rel}")
+                target.parent.mkdir(parents=True, exist_ok=True)
+                known = manifest.get(rel)
+                if self._reusable(dest, rel, known, member, verified):
+                    try:
+                        os.link(dest / rel, target)
+                    except OSError:
+                        copies.append((rel, known, target))
+                        continue
+                    written[rel] = self._stamp(target, known.crc)
+                    tick()
+                else:
+                    pending.append((rel, member, target))
+            if copies:
+                self.copier.transfer([(dest / rel, target) for rel, _, target in copies], on_progress=tick)
+                for rel, known, target in copies:
+                    written[rel] = self._stamp(target, known.crc)
+            self._materialize(pending, written, tick)
+            rewritten = len(pending)
+            if not rewritten and written.keys() == manifest.keys():
+                shutil.rmtree(staging, ignore_errors=True)
+                return 0
+            self._write_manifest(staging, written)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        self._swap_in(staging, folder)
+        return rewritten
+    
+    def _stamp(self, path: Path, crc: int) -> ManifestEntry:
+        stat = os.stat(path)
+        return ManifestEntry(stat.st_size, stat.st_mtime_ns, crc)
+    
+    def _materialize(self, pending: List[Tuple[str, object, Path]], written: Dict[str, ManifestEntry],
+                     tick: Callable[..., None]) -> None:
+        local = [item for item in pending if isinstance(item[1], _LocalMember)]
+        for rel, member, target in pending:
+            if isinstance(member, _LocalMember):
+                continue
+            member.extract(str(target))
+            written[rel] = self._stamp(target, member.crc if member.crc is not None else _crc32(str(target)))
+            tick()
+        if not local:
+            return
+        with ThreadPoolExecutor(max_workers=VERIFY_WORKERS, thread_name_prefix="hash") as pool:
+            crcs = list(pool.map(lambda item: item[1].crc, local))
+        self.copier.transfer([(member.path, target) for _, member, target in local], move=True, on_progress=tick)
+        for (rel, _, target), crc in zip(local, crcs):
+            written[rel] = self._stamp(target, crc)
+    
+    def _installed_folder(self, code: str) -> Optional[Path]:
+        if not self.delta_path:
+            return None
+        folder = self.delta_path / code
+        if folder.is_dir():
+            return folder
+        with os.scandir(self.delta_path) as it:
+            for entry in it:
+                if entry.name.upper() == code.upper() and entry.is_dir():
+                    return Path(entry.path)
+        return None
+    
+    def is_installed(self, folder: Path) -> bool:
+        manifest = self.read_manifest(folder)
+        if not manifest:
+            return all((folder / marker).exists() for marker in LEGACY_MARKERS)
+        for rel, entry in manifest.items():
+            try:
+                if os.stat(folder / rel).st_size != entry.size:
+                    return False
+            except OSError:
+                return False
+        return True
+    
+    def _check_file(self, path: Path, entry: ManifestEntry, quick: bool) -> Optional[str]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return 'missing'
+        if stat.st_size != entry.size:
+            return 'corrupt'
+        if quick and stat.st_mtime_ns == entry.mtime_ns:
+            return None
+        return None if _crc32(str(path)) == entry.crc else 'corrupt'
+    
+    def verify(self, code: str, quick: bool = False) -> Optional[VerifyResult]:
+        folder = self._installed_folder(code)
+        manifest = self.read_manifest(folder) if folder else {}
+        if not manifest:
+            return None
+        with ThreadPoolExecutor(max_workers=VERIFY_WORKERS, thread_name_prefix="verify") as pool:
+            states = list(pool.map(lambda item: self._check_file(folder / item[0], item[1], quick), manifest.items()))
+        missing = tuple(rel for rel, state in zip(manifest, states) if state == 'missing')
+        corrupt = tuple(rel for rel, state in zip(manifest, states) if state == 'corrupt')
+        return VerifyResult(code.upper(), len(manifest), missing, corrupt)
+    
+    def repair(self, code: str, archive_path: Path,
+               progress: Optional[ProgressCallback] = None) -> Tuple[bool, str, List[str]]:
+        result = self.verify(code)
+        if result is None:
+            return self.install_file(archive_path, delete_after=False, progress=progress)
+        if result.ok:
+            return True, "Nothing to repair", [result.code]
+        verified = frozenset(self.read_manifest(self._installed_folder(code))) - set(result.missing) - set(result.corrupt)
+        try:
+            with self._open_archive(archive_path) as archive:
+                group = self._group_members(archive).get(result.code)
+                if not group:
+                    return False, f"{result.code} not found in {archive_path.name}", []
+                folder, entries = group
+                with self._folder_lock(result.code):
+                    rewritten = self._install_group(folder, entries, self._progress_ticker(len(entries), progress), verified)
+        except Exception as e:
+            return False, str(e), []
+        return True, f"Repaired {rewritten} file(s)", [result.code]
+    
+    def _sync_dir(self, path: str) -> None:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+    
+    def _sync_tree(self, root: Path) -> None:
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                fd = os.open(os.path.join(dirpath, name), os.O_RDWR)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            self._sync_dir(dirpath)
+    
+    def _swap_in(self, staging: Path, folder: str) -> None:
+        self._sync_tree(staging)
+        dest = self.delta_path / folder
+        old = None
+        if dest.exists():
+            old = self.delta_path / f"{OLD_PREFIX}{folder}-{uuid.uuid4().hex[:8]}"
+            dest.rename(old)
+        try:
+            staging.rename(dest)
+        except OSError:
+            if old:
+                old.rename(dest)
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        self._sync_dir(str(self.delta_path))
+        if old:
+            threading.Thread(target=shutil.rmtree, args=(old, True), daemon=True).start()
+    
+    def recover_staging(self) -> None:
+        if not self.delta_path or not self.delta_path.is_dir():
+            return
+        with os.scandir(self.delta_path) as it:
+            leftovers = [e for e in it if e.is_dir() and e.name.startswith((STAGING_PREFIX, OLD_PREFIX))]
+        for entry in leftovers:
+            if entry.name.startswith(OLD_PREFIX):
+                folder = entry.name[len(OLD_PREFIX):].rsplit('-', 1)[0]
             else:
-                return False, f"Unsupported: {ext}"
-            return True, "OK"
+                folder = entry.name[len(STAGING_PREFIX):]
+            lock = self._folder_lock(folder.upper())
+            if not lock.acquire(blocking=False):
+                continue
+            try:
+                dest = self.delta_path / folder
+                if entry.name.startswith(OLD_PREFIX) and not dest.exists():
+                    os.rename(entry.path, dest)
+                else:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+            finally:
+                lock.release()
+    
+    def _extract_archive(self, archive_path: Path, job_dir: Path) -> Tuple[bool, str, List[str]]:
+        self._cleanup_temp(job_dir)
+        job_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            with self._open_archive(archive_path) as archive:
+                groups = self._group_members(archive)
+                if not groups:
+                    archive.extract_all(job_dir)
+                    return True, "OK", []
+                current = [code for code, (folder, entries) in groups.items() if self._group_current(folder, entries)]
+                wanted = [entry for code, (_, entries) in groups.items() if code not in current for _, entry in entries]
+                if wanted:
+                    archive.extract_members(wanted, job_dir)
+            return True, "OK", current
         except Exception as e:
-            return False, str(e)
+            return False, str(e), []
+    
+    def _cleanup_temp(self, job_dir: Path) -> None:
+        if job_dir.exists():
+            shutil.rmtree(job_dir, ignore_errors=True)
+    
+    def _install_extracted(self, file_path: Path, job_dir: Path,
+                           progress: Optional[ProgressCallback] = None) -> Tuple[bool, str, List[str]]:
+        ok, msg, current = self._extract_archive(file_path, job_dir)
+        if not ok:
+            return False, f"Extraction failed: {msg}", []
+        
+        dlc_folders = [folder for folder in self._find_dlc_folders(job_dir) if folder.name.upper() not in current]
+        if not dlc_folders:
+            self._cleanup_temp(job_dir)
+            if current:
+                return True, f"Installed 0 DLC(s), {len(current)} up to date, 0 file(s) written", current
+            return False, "No DLC folders in archive", []
+        
+        groups = [
+            (dlc_folder, [(path.relative_to(dlc_folder).as_posix(), _LocalMember(path, path.name))
+                          for path in sorted(dlc_folder.rglob('*')) if path.is_file()])
+            for dlc_folder in dlc_folders
+        ]
+        tick = self._progress_ticker(sum(len(members) for _, members in groups), progress)
+        installed_codes = []
+        rewritten = 0
+        for dlc_folder, members in groups:
+            with self._folder_lock(dlc_folder.name.upper()):
+                rewritten += self._install_group(dlc_folder.name, members, tick)
+            installed_codes.append(dlc_folder.name.upper())
+        
+        self._cleanup_temp(job_dir)
+        return (True, f"Installed {len(dlc_folders)} DLC(s), {len(current)} up to date, {rewritten} file(s) written",
+                installed_codes + current)
+    
+    def _volume(self, path: Path) -> Tuple[int, Path]:
+        path = path.resolve()
+        while not path.exists() and path != path.parent:
+            path = path.parent
+        return os.stat(path).st_dev, path
+    
+    def _folder_size(self, folder: Path) -> int:
+        manifest = self.read_manifest(folder)
+        if manifest:
+            return sum(entry.size for entry in manifest.values())
+        total = 0
+        for dirpath, _, filenames in os.walk(folder):
+            for name in filenames:
+                try:
+                    total += os.stat(os.path.join(dirpath, name)).st_size
+                except OSError:
+                    pass
+        return total
     
-    def _cleanup_temp(self) -> None:
-        if TEMP_EXTRACT_DIR.exists():
-            shutil.rmtree(TEMP_EXTRACT_DIR, ignore_errors=True)
-        TEMP_EXTRACT_DIR.mkdir(exist_ok=True)
+    def _plan_step(self, file: 'TorrentFile', path: Optional[Path]) -> PlanStep:
+        estimate = int(file.size * UNPACK_RATIO)
+        if path is None or path.suffix.lower() not in ARCHIVE_EXTENSIONS:
+            return PlanStep(file, path, file.size, estimate, 0, True)
+        try:
+            with self._open_archive(path) as archive:
+                streaming = archive.streaming
+                groups = self._group_members(archive)
+                stale = [(folder, entries) for folder, entries in groups.values() if not self._group_current(folder, entries)]
+        except Exception:
+            return PlanStep(file, path, file.size, estimate, 0, True)
+        unpacked = sum(entry.size for _, entries in stale for _, entry in entries)
+        if groups and not unpacked and stale:
+            unpacked = estimate
+        replaced = sum(self._folder_size(self.delta_path / folder) for folder, _ in stale
+                       if self.delta_path and (self.delta_path / folder).is_dir())
+        return PlanStep(file, path, path.stat().st_size, unpacked, replaced, streaming)
+    
+    def plan_installs(self, completed: List[Tuple['TorrentFile', Path]], pending: List['TorrentFile'] = (),
+                      downloaded: Optional[Dict[int, int]] = None, download_dir: Path = Path("downloads"),
+                      free: Optional[Dict[Path, int]] = None, budget: Optional[int] = None,
+                      reserved: Optional[Dict[str, int]] = None) -> InstallPlan:
+        if not self.delta_path:
+            return InstallPlan((), {}, {}, False, "Game path not set")
+        downloaded = downloaded or {}
+        volumes = {}
+        
+        def volume(path: Path) -> int:
+            dev, root = self._volume(path)
+            volumes.setdefault(dev, root)
+            return dev
+        
+        delta, temp, downloads = volume(self.delta_path), volume(TEMP_EXTRACT_DIR), volume(download_dir)
+        limits = {}
+        for dev, root in volumes.items():
+            available = shutil.disk_usage(root).free
+            for path, size in (free or {}).items():
+                if self._volume(Path(path))[0] == dev:
+                    available = size
+            limits[dev] = max(0, available - DISK_RESERVE)
+            if budget is not None:
+                limits[dev] = min(limits[dev], budget)
+            for path, size in (reserved or {}).items():
+                if self._volume(Path(path))[0] == dev:
+                    limits[dev] = max(0, limits[dev] - size)
+        
+        ready = [self._plan_step(file, path) for file, path in completed]
+        gains = sorted((step for step in ready if step.net <= 0), key=lambda step: step.unpacked)
+        costs = sorted((step for step in ready if step.net > 0), key=lambda step: step.source + step.replaced, reverse=True)
+        later = [self._plan_step(file, None) for file in pending]
+        steps = tuple(gains + costs + later)
+        
+        def simulate(downloading: List['TorrentFile'], planned: Tuple[PlanStep, ...]) -> Dict[int, int]:
+            usage = defaultdict(int)
+            peak = defaultdict(int)
+            
+            def add(dev: int, size: int) -> None:
+                usage[dev] += size
+                peak[dev] = max(peak[dev], usage[dev])
+            
+            for file in downloading:
+                add(downloads, max(0, file.size - downloaded.get(file.global_idx, 0)))
+            for step in planned:
+                if step.streaming:
+                    add(delta, step.unpacked)
+                else:
+                    add(temp, step.unpacked)
+                    if temp != delta:
+                        add(delta, step.unpacked)
+                        add(temp, -step.unpacked)
+                add(delta, -step.replaced)
+                add(downloads, -step.source)
+            return peak
+        
+        peak = simulate(pending, steps)
+        named = {str(volumes[dev]): size for dev, size in peak.items()}
+        named_limits = {str(volumes[dev]): size for dev, size in limits.items()}
+        claim = {str(volumes[dev]): size for dev, size in simulate([], tuple(gains + costs)).items() if size > 0}
+        for dev, size in peak.items():
+            if size > limits[dev]:
+                return InstallPlan(steps, named, named_limits, False,
+                                   f"needs {format_bytes(size)} on {volumes[dev]}, {format_bytes(limits[dev])} available", claim)
+        return InstallPlan(steps, named, named_limits, True, claim=claim)
     
-    def install_file(self, file_path: Path, delete_after: bool = True) -> Tuple[bool, str, List[str]]:
+    def install_file(self, file_path: Path, delete_after: bool = True, stream: bool = True,
+                     progress: Optional[ProgressCallback] = None) -> Tuple[bool, str, List[str]]:
         if not self.delta_path:
             if not self.set_game_path(None):
                 return False, "Game path not set", []
@@ -119,27 +1150,16 @@ class InstallerManager:
             return False, f"File not found: {file_path}", []
         
         ext = file_path.suffix.lower()
-        installed_codes = []
+        job_dir = TEMP_EXTRACT_DIR / uuid.uuid4().hex
         
         try:
             if ext in ARCHIVE_EXTENSIONS:
-                ok, msg = self._extract_archive(file_path)
+                if stream:
+                    ok, msg, installed_codes = self._stream_archive(file_path, job_dir, progress)
+                else:
+                    ok, msg, installed_codes = self._install_extracted(file_path, job_dir, progress)
                 if not ok:
-                    return False, f"Extraction failed: {msg}", []
-                
-                dlc_folders = self._find_dlc_folders(TEMP_EXTRACT_DIR)
-                if not dlc_folders:
-                    self._cleanup_temp()
-                    return False, "No DLC folders in archive", []
-                
-                for dlc_folder in dlc_folders:
-                    dest = self.delta_path / dlc_folder.name
-                    if dest.exists():
-                        shutil.rmtree(dest, ignore_errors=True)
-                    shutil.copytree(dlc_folder, dest, dirs_exist_ok=True)
-                    installed_codes.append(dlc_folder.name.upper())
-                
-                self._cleanup_temp()
+                    return False, msg, []
                 
                 if delete_after:
                     try:
@@ -156,20 +1176,136 @@ class InstallerManager:
                         except Exception:
                             pass
                 
-                return True, f"Installed {len(dlc_folders)} DLC(s)", installed_codes
+                return True, msg, installed_codes
             else:
                 dest = self.delta_path / file_path.name
-                shutil.copy2(file_path, dest)
                 if delete_after:
-                    try:
-                        file_path.unlink()
-                    except Exception:
-                        pass
+                    self.copier.move_file(file_path, dest)
+                else:
+                    self.copier.copy_file(file_path, dest)
                 return True, f"Copied {file_path.name}", []
         except Exception as e:
-            self._cleanup_temp()
+            self._cleanup_temp(job_dir)
             return False, str(e), []
 
 
+class InstallExecutor:
+    __slots__ = ('_installer', '_pool', '_budget', '_in_flight', '_cond', '_next_id', '_jobs', '_reserved', '_plan_lock')
+    
+    def __init__(self, installer: InstallerManager, workers: int = 2, byte_budget: int = 8 * 1024 ** 3):
+        self._installer = installer
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="install")
+        self._budget = byte_budget
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._next_id = 0
+        self._jobs: Dict[int, InstallJob] = {}
+        self._reserved: Dict[str, int] = defaultdict(int)
+        self._plan_lock = threading.Lock()
+    
+    @property
+    def jobs(self) -> List[InstallJob]:
+        with self._cond:
+            return list(self._jobs.values())
+    
+    @property
+    def reserved(self) -> Dict[str, int]:
+        with self._cond:
+            return dict(self._reserved)
+    
+    def submit(self, file_path: Path, delete_after: bool = True,
+               on_progress: Optional[Callable[[InstallProgress], None]] = None,
+               plan: Optional[Callable[[Dict[str, int]], InstallPlan]] = None) -> InstallJob:
+        with self._cond:
+            self._next_id += 1
+            job = InstallJob(self._next_id, file_path)
+            self._jobs[job.job_id] = job
+        job.future = self._pool.submit(self._run, job, delete_after, on_progress, plan)
+        job.future.add_done_callback(lambda _: self._forget(job.job_id))
+        return job
+    
+    def submit_plan(self, plan: InstallPlan, delete_after: bool = True,
+                    on_progress: Optional[Callable[['TorrentFile', InstallProgress], None]] = None,
+                    check: Optional[Callable[[PlanStep, Dict[str, int]], InstallPlan]] = None) -> List[Tuple['TorrentFile', InstallJob]]:
+        jobs = []
+        for step in plan.steps:
+            if step.path is None:
+                continue
+            job = self.submit(
+                step.path, delete_after,
+                on_progress=(lambda progress, file=step.file: on_progress(file, progress)) if on_progress else None,
+                plan=(lambda reserved, step=step: check(step, reserved)) if check else None
+            )
+            jobs.append((step.file, job))
+        return jobs
+    
+    def _forget(self, job_id: int) -> None:
+        with self._cond:
+            self._jobs.pop(job_id, None)
+            self._cond.notify_all()
+    
+    def cancel(self, job_id: int) -> bool:
+        with self._cond:
+            job = self._jobs.get(job_id)
+        if job:
+            job.cancel()
+            with self._cond:
+                self._cond.notify_all()
+        return job is not None
+    
+    def cancel_all(self) -> None:
+        for job in self.jobs:
+            job.cancel()
+        with self._cond:
+            self._cond.notify_all()
+    
+    def _run(self, job: InstallJob, delete_after: bool, on_progress: Optional[Callable[[InstallProgress], None]],
+             plan: Optional[Callable[[Dict[str, int]], InstallPlan]]) -> Tuple[bool, str, List[str]]:
+        try:
+            size = job.path.stat().st_size
+        except OSError:
+            size = 0
+        cost = min(size, self._budget)
+        with self._cond:
+            self._cond.wait_for(lambda: job.cancelled.is_set() or self._in_flight == 0 or self._in_flight + cost <= self._budget)
+            if job.cancelled.is_set():
+                return False, "Cancelled", []
+            self._in_flight += cost
+        
+        def progress(done: int, total: int, copy: Optional[CopyProgress] = None) -> None:
+            if job.cancelled.is_set():
+                raise InstallCancelled("Cancelled")
+            if on_progress:
+                on_progress(InstallProgress(job.job_id, job.path, done, total,
+                                            copy.rate if copy else 0.0, copy.eta if copy else None))
+        
+        claim: Dict[str, int] = {}
+        try:
+            if plan:
+                with self._plan_lock:
+                    with self._cond:
+                        reserved = dict(self._reserved)
+                    checked = plan(reserved)
+                    if not checked.fits:
+                        return False, f"Not enough disk space: {checked.reason}", []
+                    claim = checked.claim
+                    with self._cond:
+                        for volume, size in claim.items():
+                            self._reserved[volume] += size
+            return self._installer.install_file(job.path, delete_after=delete_after, progress=progress)
+        finally:
+            with self._cond:
+                self._in_flight -= cost
+                for volume, size in claim.items():
+                    self._reserved[volume] -= size
+                    if self._reserved[volume] <= 0:
+                        del self._reserved[volume]
+                self._cond.notify_all()
+    
+    def shutdown(self, wait: bool = True) -> None:
+        self.cancel_all()
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
 installer_mgr = InstallerManager()
 
@@ -1,14 +1,179 @@
+import os
+import re
 import json
+import hashlib
+import threading
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict
 from pathlib import Path
 from functools import lru_cache
-from typing import Dict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from difflib import SequenceMatcher
 
+NAME_THRESHOLD = 0.75
+SUBSTRING_THRESHOLD = 0.6
+MATCH_CACHE_LIMIT = 20000
+
+
+@dataclass(frozen=True, slots=True)
+class DlcMatch:
+    code: Optional[str]
+    category: str
+    name: str
+
+
+class _Name:
+    __slots__ = ('order', 'rank', 'code', 'text', 'chars', 'trigrams')
+    
+    def __init__(self, order: int, rank: int, code: str, text: str):
+        self.order = order
+        self.rank = rank
+        self.code = code
+        self.text = text
+        self.chars = Counter(text)
+        self.trigrams = {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class _MatchIndex:
+    __slots__ = ('codes', '_by_code', '_code_pattern', '_names', '_lengths', '_trigrams', '_short')
+    
+    def __init__(self, mods: Dict, normalize: Callable[[str], str]):
+        self.codes: List[str] = list(mods)
+        self._by_code: Dict[str, str] = {}
+        for code in self.codes:
+            self._by_code.setdefault(code.lower(), code)
+        alternatives = '|'.join(re.escape(code) for code in sorted(self._by_code, key=len, reverse=True))
+        self._code_pattern = re.compile(rf'(?<![a-z0-9])(?:{alternatives})(?![a-z0-9])') if alternatives else None
+        
+        names = []
+        for order, (code, info) in enumerate(mods.items()):
+            for rank, lang in enumerate(("en", "pl")):
+                text = normalize(info.get(lang, ""))
+                if text:
+                    names.append(_Name(order, rank, code, text))
+        self._names = sorted(names, key=lambda name: len(name.text))
+        self._lengths = [len(name.text) for name in self._names]
+        self._trigrams: Dict[str, List[_Name]] = {}
+        self._short: List[_Name] = []
+        for name in names:
+            if not name.trigrams:
+                self._short.append(name)
+            for trigram in name.trigrams:
+                self._trigrams.setdefault(trigram, []).append(name)
+    
+    def find_code(self, text: str) -> Optional[str]:
+        match = self._code_pattern.search(text) if self._code_pattern else None
+        return self._by_code[match.group()] if match else None
+    
+    def substrings(self, text: str) -> Iterator[_Name]:
+        hits: Dict[int, int] = {}
+        names: Dict[int, _Name] = {}
+        for trigram in {text[i:i + 3] for i in range(len(text) - 2)}:
+            for name in self._trigrams.get(trigram, ()):
+                key = id(name)
+                hits[key] = hits.get(key, 0) + 1
+                names[key] = name
+        for key, count in hits.items():
+            name = names[key]
+            if count == len(name.trigrams) and name.text in text:
+                yield name
+        for name in self._short:
+            if name.text in text:
+                yield name
+    
+    def similar(self, text: str, threshold: float) -> Iterator[_Name]:
+        size = len(text)
+        low = bisect_left(self._lengths, int(size * threshold / (2 - threshold)))
+        high = bisect_right(self._lengths, int(size * (2 - threshold) / threshold) + 1)
+        chars = Counter(text)
+        for name in self._names[low:high]:
+            total = size + len(name.text)
+            if 2.0 * min(size, len(name.text)) / total < threshold:
+                continue
+            common = sum(min(count, chars[char]) for char, count in name.chars.items())
+            if 2.0 * common / total >= threshold:
+                yield name
+
+
+class MatchCache:
+    __slots__ = ('_path', '_limit', '_digest', '_thresholds', '_entries', '_loaded', '_dirty', '_lock')
+    
+    VERSION = 1
+    
+    def __init__(self, path: Optional[Path], digest: str, limit: int = MATCH_CACHE_LIMIT):
+        self._path = path
+        self._limit = limit
+        self._digest = digest
+        self._thresholds: Optional[List[float]] = None
+        self._entries: OrderedDict = OrderedDict()
+        self._loaded = path is None
+        self._dirty = False
+        self._lock = threading.Lock()
+    
+    def _load(self) -> None:
+        self._loaded = True
+        if not self._path.exists():
+            return
+        try:
+            data = json.loads(self._path.read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            print(f"Error loading match cache: {e}")
+            return
+        if (data.get('version') != self.VERSION or data.get('locale') != self._digest
+                or data.get('thresholds') != self._thresholds):
+            self._dirty = True
+            return
+        matches = data.get('matches', {})
+        for filename in list(matches)[-self._limit:]:
+            self._entries[filename] = tuple(matches[filename])
+    
+    def _check_thresholds(self) -> None:
+        thresholds = [NAME_THRESHOLD, SUBSTRING_THRESHOLD]
+        if thresholds != self._thresholds:
+            self._thresholds = thresholds
+            if self._entries:
+                self._entries.clear()
+                self._dirty = True
+    
+    def get(self, filename: str) -> Optional[Tuple[Optional[str], str, float]]:
+        with self._lock:
+            self._check_thresholds()
+            if not self._loaded:
+                self._load()
+            entry = self._entries.get(filename)
+            if entry is not None:
+                self._entries.move_to_end(filename)
+            return entry
+    
+    def put(self, filename: str, entry: Tuple[Optional[str], str, float]) -> None:
+        with self._lock:
+            self._entries[filename] = entry
+            self._entries.move_to_end(filename)
+            while len(self._entries) > self._limit:
+                self._entries.popitem(last=False)
+            self._dirty = True
+    
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty or self._path is None:
+                return
+            data = {'version': self.VERSION, 'locale': self._digest, 'thresholds': self._thresholds,
+                    'matches': dict(self._entries)}
+            self._dirty = False
+        tmp = self._path.with_suffix('.tmp')
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(json.dumps(data), encoding='utf-8')
+            os.replace(tmp, self._path)
+        except OSError as e:
+            print(f"Error saving match cache: {e}")
+
 
 class LocaleManager:
-    __slots__ = ('_mods', '_ui', '_status', '_notifications', '_errors', '_categories', '_empty_state', '_lang', '_cache')
+    __slots__ = ('_mods', '_ui', '_status', '_notifications', '_errors', '_categories', '_empty_state', '_lang', '_cache', '_names', '_digest', '_index', '_matches')
     
-    def __init__(self, locales_path: Path, language: str = "en"):
+    def __init__(self, locales_path: Path, language: str = "en", cache_path: Optional[Path] = None):
         self._mods: Dict = {}
         self._ui: Dict = {}
         self._status: Dict = {}
@@ -18,14 +183,19 @@ class LocaleManager:
         self._empty_state: Dict = {}
         self._lang = language
         self._cache: Dict = {}
+        self._names: Dict[str, str] = {}
+        self._digest = ""
+        self._index = _MatchIndex({}, self._normalize)
         self._load(locales_path)
+        self._matches = MatchCache(cache_path, self._digest)
     
     def _load(self, path: Path) -> None:
         if not path.exists():
             return
         try:
-            with path.open('r', encoding='utf-8') as f:
-                data = json.load(f)
+            raw = path.read_bytes()
+            data = json.loads(raw.decode('utf-8'))
+            self._digest = hashlib.sha1(raw).hexdigest()
             self._mods = data.get("mods", {})
             self._ui = data.get("ui", {})
             self._status = data.get("status", {})
@@ -33,6 +203,7 @@ class LocaleManager:
             self._errors = data.get("errors", {})
             self._categories = data.get("categories", {})
             self._empty_state = data.get("empty_state", {})
+            self._index = _MatchIndex(self._mods, self._normalize)
             self._build_cache()
         except Exception as e:
             print(f"Error loading locales: {e}")
@@ -42,12 +213,16 @@ class LocaleManager:
         for section in [self._ui, self._status, self._notifications, self._errors, self._empty_state]:
             for key, translations in section.items():
                 self._cache[key] = translations.get(self._lang, translations.get("en", key))
+        self._names = {}
+        for code, info in self._mods.items():
+            name = info.get(self._lang, info.get("en", ""))
+            if name:
+                self._names[code] = name.replace("_", " ")
     
     def set_language(self, lang: str) -> None:
         if lang != self._lang:
             self._lang = lang
             self._build_cache()
-            self.get_mod_name.cache_clear()
             self.get_category_name.cache_clear()
     
     def _normalize(self, text: str) -> str:
@@ -56,58 +231,63 @@ class LocaleManager:
     def _similarity(self, a: str, b: str) -> float:
         return SequenceMatcher(None, a, b).ratio()
     
-    @lru_cache(maxsize=256)
-    def get_mod_name(self, filename: str) -> str:
+    def _recognize(self, filename: str) -> Tuple[Optional[str], str]:
+        entry = self._matches.get(filename)
+        if entry is None:
+            entry = self._resolve(filename)
+            self._matches.put(filename, entry)
+        return entry[0], entry[1]
+    
+    def _resolve(self, filename: str) -> Tuple[Optional[str], str, float]:
         filename_norm = self._normalize(filename)
+        index = self._index
+        code = index.find_code(filename_norm)
+        if code is not None:
+            return code, code[:2], 1.0
+        
+        candidates: Dict[int, _Name] = {id(name): name for name in index.similar(filename_norm, NAME_THRESHOLD)}
+        contained = set()
+        for name in index.substrings(filename_norm):
+            candidates.setdefault(id(name), name)
+            contained.add(id(name))
+        
         best_match = None
         best_score = 0.0
-        
-        for code, info in self._mods.items():
-            if code.lower() in filename_norm:
-                name = info.get(self._lang, info.get("en", ""))
-                return name.replace("_", " ") if name else self.t("unknown_mod")
-            
-            en_name = self._normalize(info.get("en", ""))
-            if en_name:
-                score = self._similarity(filename_norm, en_name)
-                if score > best_score and score >= 0.75:
-                    best_score = score
-                    best_match = info
-                if en_name in filename_norm and score > 0.6:
-                    best_score = max(best_score, score)
-                    best_match = info
-            
-            pl_name = self._normalize(info.get("pl", ""))
-            if pl_name:
-                score = self._similarity(filename_norm, pl_name)
-                if score > best_score and score >= 0.75:
-                    best_score = score
-                    best_match = info
-                if pl_name in filename_norm and score > 0.6:
+        category_order = None
+        for name in sorted(candidates.values(), key=lambda name: (name.order, name.rank)):
+            score = self._similarity(filename_norm, name.text)
+            if score > best_score and score >= NAME_THRESHOLD:
+                best_score = score
+                best_match = name.code
+            if id(name) in contained:
+                if score > SUBSTRING_THRESHOLD:
                     best_score = max(best_score, score)
-                    best_match = info
-        
-        if best_match:
-            name = best_match.get(self._lang, best_match.get("en", ""))
-            return name.replace("_", " ") if name else self.t("unknown_mod")
-        return self.t("unknown_mod")
+                    best_match = name.code
+                if category_order is None:
+                    category_order = name.order
+            elif category_order is None and score >= NAME_THRESHOLD:
+                category_order = name.order
+        category = index.codes[category_order][:2] if category_order is not None else 'OTHER'
+        return best_match, category, round(best_score, 4)
+    
+    def recognize(self, filename: str) -> DlcMatch:
+        code, category = self._recognize(filename)
+        return DlcMatch(code, category, self.mod_name(code))
+    
+    def match_code(self, filename: str) -> Optional[str]:
+        return self._recognize(filename)[0]
+    
+    def mod_name(self, code: Optional[str]) -> str:
+        return self._names.get(code) or self.t("unknown_mod")
+    
+    def get_mod_name(self, filename: str) -> str:
+        return self.mod_name(self.match_code(filename))
     
-    @lru_cache(maxsize=256)
     def get_mod_category(self, filename: str) -> str:
-        filename_norm = self._normalize(filename)
-        
-        for code, info in self._mods.items():
-            if code.lower() in filename_norm:
-                return code[:2]
-            
-            en_name = self._normalize(info.get("en", ""))
-            pl_name = self._normalize(info.get("pl", ""))
-            
-            if en_name and (en_name in filename_norm or self._similarity(filename_norm, en_name) >= 0.75):
-                return code[:2]
-            if pl_name and (pl_name in filename_norm or self._similarity(filename_norm, pl_name) >= 0.75):
-                return code[:2]
-        return 'OTHER'
+        return self._recognize(filename)[1]
+    
+    def save_matches(self) -> None:
+        self._matches.save()
     
     @lru_cache(maxsize=64)
     def get_category_name(self, category: str) -> str:
@@ -122,3 +302,7 @@ class LocaleManager:
     @property
     def language(self) -> str:
         return self._lang
+    
+    @property
+    def digest(self) -> str:
+        return self._digest
@@ -1,27 +1,512 @@
+import os
+import json
+import hashlib
 import time
+import asyncio
+import threading
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
 import libtorrent as lt
+from libs.locale import LocaleManager
 
 
 @dataclass(frozen=True, slots=True)
 class TorrentFile:
     name: str
-    mod_name: str
     size: int
     handle_idx: int
     file_idx: int
     global_idx: int
+    dlc_code: Optional[str] = None
+    category: str = 'OTHER'
+    duplicate_of: Optional[int] = None
+
+
+def _infohash(info: lt.torrent_info) -> str:
+    return str(info.info_hashes().get_best())
+
+
+def _content_key(info: lt.torrent_info, file_idx: int) -> Optional[str]:
+    fs = info.files()
+    size = fs.file_size(file_idx)
+    if size == 0:
+        return None
+    if info.info_hashes().has_v2():
+        return f"v2:{fs.root(file_idx)}"
+    piece_size = info.piece_length()
+    offset = fs.file_offset(file_idx)
+    first = -(-offset // piece_size)
+    end = (offset + size) // piece_size
+    if first >= end:
+        return None
+    digest = hashlib.sha1(f"{size}:{piece_size}:{offset % piece_size}".encode())
+    for piece in range(first, end):
+        digest.update(bytes(info.hash_for_piece(piece)))
+    return f"v1:{digest.hexdigest()}"
+
+
+class TorrentCache:
+    __slots__ = ('_path', '_entries', '_by_path', '_dirty')
+    
+    VERSION = 2
+    
+    def __init__(self, path: Path):
+        self._path = path
+        self._entries: Dict[str, Dict] = {}
+        self._by_path: Dict[str, str] = {}
+        self._dirty = False
+        self._load()
+    
+    def _load(self) -> None:
+        if not self._path.exists():
+            return
+        try:
+            data = json.loads(self._path.read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            print(f"Error loading torrent cache: {e}")
+            return
+        if data.get('version') != self.VERSION:
+            return
+        self._entries = data.get('torrents', {})
+        self._by_path = {entry['path']: infohash for infohash, entry in self._entries.items()}
+    
+    def lookup(self, torrent_path: Path, locale_digest: str) -> Optional[Tuple[str, Dict]]:
+        infohash = self._by_path.get(str(torrent_path))
+        if not infohash:
+            return None
+        entry = self._entries[infohash]
+        stat = torrent_path.stat()
+        if entry['mtime'] != stat.st_mtime_ns or entry['size'] != stat.st_size or entry['locale'] != locale_digest:
+            return None
+        return infohash, entry
+    
+    def store(self, torrent_path: Path, infohash: str, locale_digest: str, files: List[List]) -> None:
+        stat = torrent_path.stat()
+        old = self._entries.get(infohash)
+        if old:
+            self._by_path.pop(old['path'], None)
+        self._entries[infohash] = {
+            'path': str(torrent_path),
+            'mtime': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'locale': locale_digest,
+            'files': files,
+        }
+        self._by_path[str(torrent_path)] = infohash
+        self._dirty = True
+    
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        tmp = self._path.with_suffix('.tmp')
+        try:
+            tmp.write_text(json.dumps({'version': self.VERSION, 'torrents': self._entries}), encoding='utf-8')
+            os.replace(tmp, self._path)
+            self._dirty = False
+        except OSError as e:
+            print(f"Error saving torrent cache: {e}")
+
+
+@dataclass(frozen=True, slots=True)
+class ProgressEvent:
+    progress: Dict[int, int]
+    completed: Tuple[int, ...]
+    peers: int
+    download_rate: int
+
+
+class FileScheduler:
+    __slots__ = ('_manager', '_lock', 'window', '_queued', '_active', '_lead', '_lead_next', '_lead_last')
+    
+    AUTO = 0
+    MAX_WINDOW = 8
+    PER_FILE_RATE = 4 * 1024 * 1024
+    DEADLINE_PIECES = 32
+    DEADLINE_STEP_MS = 500
+    
+    def __init__(self, manager: 'TorrentManager'):
+        self._manager = manager
+        self._lock = threading.Lock()
+        self.window: Optional[int] = None
+        self._queued: List[TorrentFile] = []
+        self._active: List[TorrentFile] = []
+        self._lead: Optional[TorrentFile] = None
+        self._lead_next = 0
+        self._lead_last = -1
+    
+    @property
+    def enabled(self) -> bool:
+        return self.window is not None
+    
+    def plan(self, files: List[TorrentFile], window: Optional[int]) -> List[List[int]]:
+        priorities = [[0] * h.torrent_file().num_files() for h in self._manager.handles]
+        with self._lock:
+            self.window = window
+            if window is None:
+                self._queued, self._active = [], []
+                for file in files:
+                    priorities[file.handle_idx][file.file_idx] = 7
+                return priorities
+            size = window if window > 0 else 1
+            self._active, self._queued = list(files[:size]), list(files[size:])
+            for file in self._queued:
+                priorities[file.handle_idx][file.file_idx] = 1
+            for file in self._active:
+                priorities[file.handle_idx][file.file_idx] = 7
+            self._lead = None
+        return priorities
+    
+    def start(self, completed: List[int]) -> None:
+        for global_idx in completed:
+            self.on_file_completed(global_idx)
+        with self._lock:
+            self._set_lead()
+    
+    def reset(self) -> None:
+        with self._lock:
+            self.window = None
+            self._queued, self._active = [], []
+            self._lead = None
+    
+    def on_file_completed(self, global_idx: int) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._queued = [f for f in self._queued if f.global_idx != global_idx]
+            self._active = [f for f in self._active if f.global_idx != global_idx]
+            target = self.window if self.window else 1
+            while self._queued and len(self._active) < target:
+                self._promote()
+            self._set_lead()
+    
+    def on_piece(self, global_idx: int) -> None:
+        if self._lead is None or self._lead.global_idx != global_idx:
+            return
+        with self._lock:
+            self._extend_deadlines(1)
+    
+    def adapt(self, download_rate: int) -> None:
+        if self.window != self.AUTO:
+            return
+        with self._lock:
+            target = min(self.MAX_WINDOW, download_rate // self.PER_FILE_RATE + 1)
+            while self._queued and len(self._active) < target:
+                self._promote()
+    
+    def _promote(self) -> None:
+        file = self._queued.pop(0)
+        self._active.append(file)
+        self._manager.handles[file.handle_idx].file_priority(file.file_idx, 7)
+    
+    def _set_lead(self) -> None:
+        lead = self._active[0] if self._active else None
+        if lead is self._lead:
+            return
+        self._lead = lead
+        if lead is None:
+            return
+        handle = self._manager.handles[lead.handle_idx]
+        info = handle.torrent_file()
+        self._lead_next = info.map_file(lead.file_idx, 0, 0).piece
+        self._lead_last = info.map_file(lead.file_idx, max(lead.size - 1, 0), 0).piece
+        self._extend_deadlines(self.DEADLINE_PIECES)
+    
+    def _extend_deadlines(self, count: int) -> None:
+        if self._lead is None:
+            return
+        handle = self._manager.handles[self._lead.handle_idx]
+        scheduled = 0
+        while scheduled < count and self._lead_next <= self._lead_last:
+            piece = self._lead_next
+            self._lead_next += 1
+            if handle.have_piece(piece):
+                continue
+            scheduled += 1
+            handle.set_piece_deadline(piece, self.DEADLINE_STEP_MS * (self.DEADLINE_PIECES - count + scheduled))
+
+
+class AutoTuner:
+    __slots__ = ('_manager', '_last_bytes', '_last_time', 'current')
+    
+    INTERVAL = 5.0
+    LIMITS = {
+        'connections_limit': (100, 1500),
+        'max_out_request_queue': (250, 3000),
+        'aio_threads': (2, 32),
+    }
+    PEER_RATE_HIGH = 512 * 1024
+    
+    def __init__(self, manager: 'TorrentManager'):
+        self._manager = manager
+        self._last_bytes: Optional[int] = None
+        self._last_time = 0.0
+        self.current: Dict[str, int] = {}
+    
+    def reset(self, settings: Dict) -> None:
+        self.current = {key: settings[key] for key in self.LIMITS if key in settings}
+        self._last_bytes = None
+    
+    def request(self) -> None:
+        self._manager.session.post_session_stats()
+    
+    def _value(self, values: Dict[str, int], name: str) -> int:
+        return values.get(name, 0)
+    
+    def on_stats(self, values) -> None:
+        now = time.monotonic()
+        received = self._value(values, 'net.recv_payload_bytes')
+        if self._last_bytes is None:
+            self._last_bytes, self._last_time = received, now
+            return
+        rate = (received - self._last_bytes) / max(now - self._last_time, 1e-3)
+        self._last_bytes, self._last_time = received, now
+        peers = self._value(values, 'peer.num_peers_connected')
+        disk_queue = self._value(values, 'disk.queued_disk_bytes')
+        max_disk_queue = self._manager.session.get_settings().get('max_queued_disk_bytes', 0)
+        
+        changes = {}
+        if max_disk_queue and disk_queue > max_disk_queue * 0.8:
+            changes['aio_threads'] = (self.current.get('aio_threads', 4) * 2, "disk queue saturated")
+            changes['max_out_request_queue'] = (self.current.get('max_out_request_queue', 500) * 3 // 4, "disk queue saturated")
+        else:
+            if peers >= self.current.get('connections_limit', 0) * 0.9:
+                changes['connections_limit'] = (self.current['connections_limit'] * 3 // 2, f"{peers} peers at limit")
+            if peers and rate / peers > self.PEER_RATE_HIGH:
+                changes['max_out_request_queue'] = (self.current.get('max_out_request_queue', 500) * 3 // 2, f"{rate / peers / 1024:.0f} KB/s per peer")
+        self._apply(changes, rate, peers, disk_queue)
+    
+    def _apply(self, changes: Dict, rate: float, peers: int, disk_queue: int) -> None:
+        update = {}
+        for key, (value, reason) in changes.items():
+            low, high = self.LIMITS[key]
+            value = max(low, min(high, int(value)))
+            if value == self.current.get(key):
+                continue
+            print(f"Auto-tune: {key} {self.current.get(key)} -> {value} ({reason}; "
+                  f"{rate / 1024 / 1024:.1f} MB/s, {peers} peers, {disk_queue // 1024} KB disk queue)")
+            self.current[key] = value
+            update[key] = value
+        if update:
+            self._manager.session.apply_settings(update)
+
+
+class ProgressEngine:
+    __slots__ = ('_manager', '_thread', '_running', '_lock', '_loop', '_queue', '_tracked',
+                 '_done', '_changed', '_completed', '_status', '_resume_pending', '_resume_cond', '_last_resume',
+                 '_peers', '_peer_waiters', '_last_tune')
+    
+    TICK = 0.25
+    RESUME_INTERVAL = 60.0
+    
+    def __init__(self, manager: 'TorrentManager'):
+        self._manager = manager
+        self._thread: Optional[threading.Thread] = None
+        self._running = threading.Event()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tracked: Dict[int, int] = {}
+        self._done: Dict[int, int] = {}
+        self._changed: set = set()
+        self._completed: List[int] = []
+        self._status: Dict = {}
+        self._resume_pending = 0
+        self._resume_cond = threading.Condition()
+        self._last_resume = time.monotonic()
+        self._peers = 0
+        self._peer_waiters: List[asyncio.Future] = []
+        self._last_tune = time.monotonic()
+    
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._running.set()
+        self._thread = threading.Thread(target=self._run, name="torrent-alerts", daemon=True)
+        self._thread.start()
+    
+    def shutdown(self) -> None:
+        self._running.clear()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+    
+    def subscribe(self) -> asyncio.Queue:
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        return self._queue
+    
+    def track(self, files: List[TorrentFile]) -> List[int]:
+        handles = self._manager.handles
+        baseline = {}
+        for handle_idx in {f.handle_idx for f in files}:
+            baseline[handle_idx] = handles[handle_idx].file_progress(flags=lt.torrent_handle.piece_granularity)
+        with self._lock:
+            self._tracked = {f.global_idx: f.size for f in files}
+            self._done = {f.global_idx: min(baseline[f.handle_idx][f.file_idx], f.size) for f in files}
+            self._changed = set(self._done)
+            self._completed = [idx for idx, done in self._done.items() if done >= self._tracked[idx]]
+            self._status.clear()
+            return list(self._completed)
+    
+    def untrack(self) -> None:
+        with self._lock:
+            self._tracked = {}
+            self._done = {}
+            self._changed.clear()
+            self._completed = []
+            self._peers = 0
+        self._put(None)
+        self._resolve_waiters(0)
+    
+    @property
+    def peers(self) -> int:
+        return self._peers
+    
+    @property
+    def connecting(self) -> bool:
+        return bool(self._tracked) and self._peers == 0
+    
+    def peers_found(self) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if self._tracked and self._peers > 0:
+                future.set_result(self._peers)
+            else:
+                self._peer_waiters.append(future)
+        return future
+    
+    def _resolve_waiters(self, peers: int) -> None:
+        with self._lock:
+            waiters, self._peer_waiters = self._peer_waiters, []
+        for future in waiters:
+            loop = future.get_loop()
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(self._set_peers, future, peers)
+    
+    @staticmethod
+    def _set_peers(future: asyncio.Future, peers: int) -> None:
+        if not future.done():
+            future.set_result(peers)
+    
+    def request_resume(self, handles: List, flags: int = 0) -> None:
+        handles = [h for h in handles if h.is_valid()]
+        with self._resume_cond:
+            self._resume_pending += len(handles)
+        for handle in handles:
+            handle.save_resume_data(flags)
+    
+    def wait_resume(self, timeout: float) -> bool:
+        with self._resume_cond:
+            return self._resume_cond.wait_for(lambda: self._resume_pending <= 0, timeout)
+    
+    def _resume_done(self) -> None:
+        with self._resume_cond:
+            self._resume_pending = max(0, self._resume_pending - 1)
+            self._resume_cond.notify_all()
+    
+    def _run(self) -> None:
+        session = self._manager.session
+        next_tick = time.monotonic() + self.TICK
+        while self._running.is_set():
+            timeout = max(0.0, next_tick - time.monotonic())
+            if session.wait_for_alert(int(timeout * 1000)):
+                for alert in session.pop_alerts():
+                    try:
+                        self._dispatch(alert)
+                    except Exception as e:
+                        print(f"Error handling {type(alert).__name__}: {e}")
+            if time.monotonic() >= next_tick:
+                next_tick = time.monotonic() + self.TICK
+                if self._tracked:
+                    session.post_torrent_updates()
+                    self._publish()
+                    if time.monotonic() - self._last_resume >= self.RESUME_INTERVAL:
+                        self._last_resume = time.monotonic()
+                        self.request_resume(self._manager.handles, lt.torrent_handle.only_if_modified)
+                    if self._manager.auto_tune and time.monotonic() - self._last_tune >= AutoTuner.INTERVAL:
+                        self._last_tune = time.monotonic()
+                        self._manager.tuner.request()
+    
+    def _dispatch(self, alert) -> None:
+        if isinstance(alert, lt.state_update_alert):
+            for status in alert.status:
+                self._status[status.handle] = (status.num_peers, status.download_rate)
+        elif isinstance(alert, lt.piece_finished_alert):
+            self._on_piece(alert.handle, alert.piece_index)
+        elif isinstance(alert, lt.file_completed_alert):
+            self._on_file(alert.handle, alert.index)
+            self.request_resume([alert.handle], lt.torrent_handle.flush_disk_cache)
+        elif isinstance(alert, lt.save_resume_data_alert):
+            self._manager.write_resume(alert.params)
+            self._resume_done()
+        elif isinstance(alert, lt.save_resume_data_failed_alert):
+            self._resume_done()
+        elif isinstance(alert, lt.add_torrent_alert):
+            self._manager.on_torrent_added(alert)
+        elif isinstance(alert, lt.session_stats_alert):
+            self._manager.tuner.on_stats(alert.values)
+    
+    def _global_idx(self, handle, file_idx: int) -> Optional[int]:
+        offset = self._manager.offsets.get(handle)
+        return None if offset is None else offset + file_idx
+    
+    def _on_piece(self, handle, piece: int) -> None:
+        info = handle.torrent_file()
+        if info is None:
+            return
+        with self._lock:
+            for file_slice in info.map_block(piece, 0, info.piece_size(piece)):
+                idx = self._global_idx(handle, file_slice.file_index)
+                if idx not in self._tracked:
+                    continue
+                self._done[idx] = min(self._done[idx] + file_slice.size, self._tracked[idx])
+                self._changed.add(idx)
+                self._manager.scheduler.on_piece(idx)
+    
+    def _on_file(self, handle, file_idx: int) -> None:
+        with self._lock:
+            idx = self._global_idx(handle, file_idx)
+            if idx not in self._tracked:
+                return
+            self._done[idx] = self._tracked[idx]
+            self._changed.add(idx)
+            self._completed.append(idx)
+        self._manager.scheduler.on_file_completed(idx)
+    
+    @staticmethod
+    def _logical(files: List[TorrentFile], idx: int) -> int:
+        duplicate_of = files[idx].duplicate_of
+        return idx if duplicate_of is None else duplicate_of
+    
+    def _publish(self) -> None:
+        logical = self._manager.files
+        with self._lock:
+            progress = {self._logical(logical, idx): self._done[idx] for idx in self._changed}
+            completed = tuple(self._logical(logical, idx) for idx in self._completed)
+            self._changed.clear()
+            self._completed = []
+        peers = sum(s[0] for s in self._status.values())
+        rate = sum(s[1] for s in self._status.values())
+        self._peers = peers
+        self._manager.scheduler.adapt(rate)
+        if peers > 0 and self._peer_waiters:
+            self._resolve_waiters(peers)
+        self._put(ProgressEvent(progress=progress, completed=completed, peers=peers, download_rate=rate))
+    
+    def _put(self, event: Optional[ProgressEvent]) -> None:
+        if self._loop and self._queue and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, event)
 
 
 class TorrentManager:
-    __slots__ = ('session', 'handles', 'files', '_active', '_source', '_download')
+    __slots__ = ('session', 'handles', 'files', 'offsets', 'engine', 'scheduler', 'tuner', 'cache', 'profile', 'auto_tune', 'copies', '_by_content', '_scheduled', '_adding', '_load_cond', '_source', '_download', '_resume',
+                 '_state_dir', '_peer_cache')
     
     SETTINGS = {
-        'connections_limit': 800,
         'connection_speed': 500,
-        'max_out_request_queue': 1500,
         'peer_connect_timeout': 7,
         'active_downloads': 20,
         'active_seeds': 20,
@@ -30,8 +515,32 @@ class TorrentManager:
         'enable_upnp': True,
         'announce_to_all_trackers': True,
         'prefer_udp_trackers': True,
-        'aio_threads': 16,
-        'cache_size': 2048,
+    }
+    
+    PROFILES = {
+        'low-memory': {
+            'connections_limit': 200,
+            'max_out_request_queue': 500,
+            'aio_threads': 2,
+            'cache_size': 256,
+            'max_queued_disk_bytes': 1024 * 1024,
+            'send_buffer_watermark': 256 * 1024,
+        },
+        'balanced': {
+            'connections_limit': 400,
+            'max_out_request_queue': 1000,
+            'aio_threads': 8,
+            'cache_size': 1024,
+            'max_queued_disk_bytes': 4 * 1024 * 1024,
+        },
+        'max-throughput': {
+            'connections_limit': 800,
+            'max_out_request_queue': 1500,
+            'aio_threads': 16,
+            'cache_size': 2048,
+            'max_queued_disk_bytes': 16 * 1024 * 1024,
+            'send_buffer_watermark': 3 * 1024 * 1024,
+        },
     }
     
     DHT_ROUTERS = (
@@ -40,108 +549,368 @@ class TorrentManager:
         ("router.utorrent.com", 6881),
     )
     
-    def __init__(self, source_dir: Path, download_dir: Path):
+    PEER_CACHE_LIMIT = 50
+    LOAD_WORKERS = 8
+    
+    ALERT_MASK = (
+        lt.alert.category_t.error_notification
+        | lt.alert.category_t.status_notification
+        | lt.alert.category_t.storage_notification
+        | lt.alert.category_t.file_progress_notification
+        | lt.alert.category_t.piece_progress_notification
+    )
+    
+    def __init__(self, source_dir: Path, download_dir: Path, profile: str = 'balanced', auto_tune: bool = False):
+        if profile not in self.PROFILES:
+            raise ValueError(f"Unknown settings profile: {profile}")
+        self.profile = profile
+        self.auto_tune = auto_tune
         self._source = source_dir
         self._download = download_dir
         self.session: Optional[lt.session] = None
         self.handles: List = []
         self.files: List[TorrentFile] = []
-        self._active = False
+        self.offsets: Dict = {}
+        self.copies: Dict[int, List[TorrentFile]] = {}
+        self._by_content: Dict[str, int] = {}
+        self._scheduled: Dict[int, TorrentFile] = {}
+        self._adding: Dict[str, Tuple] = {}
+        self._load_cond = threading.Condition()
+        self.engine = ProgressEngine(self)
+        self.scheduler = FileScheduler(self)
+        self.tuner = AutoTuner(self)
+        self._resume = download_dir / ".resume"
         self._source.mkdir(exist_ok=True)
         self._download.mkdir(exist_ok=True)
+        self._resume.mkdir(exist_ok=True)
+        self.cache = TorrentCache(download_dir / ".torrent_cache.json")
+        self._state_dir = download_dir / ".session"
+        self._state_dir.mkdir(exist_ok=True)
+        self._peer_cache: Dict[str, List[List]] = {}
     
     def init_session(self) -> None:
         if self.session:
             return
-        self.session = lt.session()
+        params = self._load_session_params()
+        self.session = lt.session(params) if params is not None else lt.session()
+        self._peer_cache = self._load_peer_cache()
         settings = self.session.get_settings()
         settings.update(self.SETTINGS)
+        settings.update(self.PROFILES[self.profile])
+        mask = self.ALERT_MASK | lt.alert.category_t.stats_notification if self.auto_tune else self.ALERT_MASK
+        settings['alert_mask'] = int(mask)
         self.session.apply_settings(settings)
+        self.tuner.reset(settings)
         for router, port in self.DHT_ROUTERS:
             self.session.add_dht_router(router, port)
-        self.session.start_dht()
-        self.session.start_lsd()
-        self.session.start_upnp()
+        self.engine.start()
+    
+    def set_profile(self, profile: str) -> None:
+        if profile not in self.PROFILES:
+            raise ValueError(f"Unknown settings profile: {profile}")
+        self.profile = profile
+        if self.session:
+            self.session.apply_settings(self.PROFILES[profile])
+            self.tuner.reset(self.session.get_settings())
+    
+    def _load_session_params(self) -> Optional[lt.session_params]:
+        path = self._state_dir / "session.dat"
+        if not path.exists():
+            return None
+        try:
+            return lt.read_session_params(path.read_bytes())
+        except Exception as e:
+            print(f"Error reading session state: {e}")
+            return None
+    
+    def _load_peer_cache(self) -> Dict[str, List[List]]:
+        path = self._state_dir / "peers.json"
+        if not path.exists():
+            return {}
+        try:
+            return json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            print(f"Error reading peer cache: {e}")
+            return {}
+    
+    def _remember_peers(self) -> None:
+        for handle in self.handles:
+            if not handle.is_valid():
+                continue
+            good = [
+                [peer.ip[0], peer.ip[1]] for peer in handle.get_peer_info()
+                if not peer.source & lt.peer_info.incoming
+                and (peer.total_download > 0 or peer.flags & lt.peer_info.seed)
+            ]
+            if not good:
+                continue
+            infohash = str(handle.info_hashes().get_best())
+            known = [p for p in self._peer_cache.get(infohash, []) if p not in good]
+            self._peer_cache[infohash] = (good + known)[:self.PEER_CACHE_LIMIT]
+    
+    def save_session_state(self) -> None:
+        if not self.session:
+            return
+        self._remember_peers()
+        try:
+            state = lt.write_session_params_buf(self.session.session_state())
+            tmp = self._state_dir / "session.tmp"
+            tmp.write_bytes(state)
+            os.replace(tmp, self._state_dir / "session.dat")
+            tmp = self._state_dir / "peers.tmp"
+            tmp.write_text(json.dumps(self._peer_cache), encoding='utf-8')
+            os.replace(tmp, self._state_dir / "peers.json")
+        except OSError as e:
+            print(f"Error saving session state: {e}")
     
-    def load_torrents(self, get_mod_name_func) -> bool:
+    def _connect_known_peers(self, handle) -> None:
+        for ip, port in self._peer_cache.get(str(handle.info_hashes().get_best()), []):
+            try:
+                handle.connect_peer((ip, port))
+            except RuntimeError:
+                pass
+    
+    def load_torrents(self, locale: LocaleManager, on_files: Optional[Callable[[List[TorrentFile]], None]] = None,
+                      timeout: float = 60.0) -> bool:
         torrents = list(self._source.glob("*.torrent"))
         if not torrents:
             return False
         
-        self.handles.clear()
-        self.files.clear()
-        global_idx = 0
+        with self._load_cond:
+            self.handles.clear()
+            self.files.clear()
+            self.offsets.clear()
+            self.copies.clear()
+            self._by_content.clear()
+            self._adding.clear()
+        
+        with ThreadPoolExecutor(max_workers=min(self.LOAD_WORKERS, len(torrents))) as pool:
+            jobs = [pool.submit(self._prepare, torrent_path, locale) for torrent_path in torrents]
+            for job in as_completed(jobs):
+                try:
+                    torrent_path, infohash, info, table, cached = job.result()
+                except Exception as e:
+                    print(f"Error loading torrent: {e}")
+                    continue
+                if not cached:
+                    self.cache.store(torrent_path, infohash, locale.digest, table)
+                handle = self.session.find_torrent(lt.sha1_hash(bytes.fromhex(infohash)))
+                if handle.is_valid():
+                    self._register(handle, table, on_files)
+                    continue
+                if info is None:
+                    info = lt.torrent_info(str(torrent_path))
+                params, resumed = self._add_params(info)
+                with self._load_cond:
+                    self._adding[infohash] = (table, resumed, on_files)
+                self.session.async_add_torrent(params)
         
-        for torrent_path in torrents:
-            info = lt.torrent_info(str(torrent_path))
+        with self._load_cond:
+            self._load_cond.wait_for(lambda: not self._adding, timeout)
+            self._adding.clear()
+        self.cache.save()
+        locale.save_matches()
+        return bool(self.handles)
+    
+    def _prepare(self, torrent_path: Path, locale: LocaleManager) -> Tuple[Path, str, Optional[lt.torrent_info], List[List], bool]:
+        cached = self.cache.lookup(torrent_path, locale.digest)
+        if cached:
+            infohash = cached[0]
+            info = None
+            if not self.session.find_torrent(lt.sha1_hash(bytes.fromhex(infohash))).is_valid():
+                info = lt.torrent_info(str(torrent_path))
+            return torrent_path, infohash, info, cached[1]['files'], True
+        info = lt.torrent_info(str(torrent_path))
+        return torrent_path, _infohash(info), info, self._file_table(info, locale), False
+    
+    def _add_params(self, info: lt.torrent_info) -> Tuple[lt.add_torrent_params, bool]:
+        params = self._read_resume(info)
+        resumed = params is not None
+        if not resumed:
             params = lt.add_torrent_params()
-            params.ti = info
-            params.save_path = str(self._download)
-            params.storage_mode = lt.storage_mode_t.storage_mode_sparse
-            params.flags |= lt.torrent_flags.auto_managed | lt.torrent_flags.paused
-            handle = self.session.add_torrent(params)
-            handle.set_max_connections(250)
-            handle.prioritize_files([0] * info.num_files())
+        params.ti = info
+        params.save_path = str(self._download)
+        params.storage_mode = lt.storage_mode_t.storage_mode_sparse
+        params.flags |= lt.torrent_flags.paused
+        if resumed:
+            params.flags &= ~lt.torrent_flags.auto_managed
+        else:
+            params.flags |= lt.torrent_flags.auto_managed
+        return params, resumed
+    
+    def on_torrent_added(self, alert) -> None:
+        infohash = str(alert.params.ti.info_hashes().get_best()) if alert.params.ti else None
+        with self._load_cond:
+            pending = self._adding.pop(infohash, None)
+            self._load_cond.notify_all()
+        if pending is None:
+            return
+        table, resumed, on_files = pending
+        if alert.error.value():
+            print(f"Error adding torrent: {alert.error.message()}")
+            return
+        handle = alert.handle
+        handle.set_max_connections(250)
+        if not resumed:
+            handle.prioritize_files([0] * len(table))
+        self._register(handle, table, on_files)
+    
+    def _register(self, handle, table: List[List], on_files: Optional[Callable[[List[TorrentFile]], None]]) -> None:
+        with self._load_cond:
+            handle_idx = len(self.handles)
+            global_idx = len(self.files)
             self.handles.append(handle)
-            handle_idx = len(self.handles) - 1
-            
-            for file_idx in range(info.num_files()):
-                file_info = info.file_at(file_idx)
-                file_name = Path(file_info.path).name
-                self.files.append(TorrentFile(
+            self.offsets[handle] = global_idx
+            batch = []
+            for i, (file_name, size, file_idx, dlc_code, category, content_key) in enumerate(table):
+                primary = self._by_content.get(content_key) if content_key else None
+                if primary is None or primary >= global_idx:
+                    primary = global_idx + i
+                    if content_key:
+                        self._by_content.setdefault(content_key, primary)
+                file = TorrentFile(
                     name=file_name,
-                    mod_name=get_mod_name_func(file_name),
-                    size=file_info.size,
+                    size=size,
                     handle_idx=handle_idx,
                     file_idx=file_idx,
-                    global_idx=global_idx
-                ))
-                global_idx += 1
-        return True
-    
-    def start_download(self, selected_files: List[TorrentFile]) -> None:
-        self._active = True
-        priorities = {i: [0] * h.torrent_file().num_files() for i, h in enumerate(self.handles)}
-        for file in selected_files:
-            priorities[file.handle_idx][file.file_idx] = 7
-        for handle_idx, handle in enumerate(self.handles):
-            handle.prioritize_files(priorities[handle_idx])
+                    global_idx=global_idx + i,
+                    dlc_code=dlc_code,
+                    category=category,
+                    duplicate_of=primary if primary != global_idx + i else None
+                )
+                if file.duplicate_of is not None:
+                    self.copies.setdefault(primary, []).append(file)
+                batch.append(file)
+            self.files.extend(batch)
+        if on_files:
+            on_files([f for f in batch if f.duplicate_of is None])
+    
+    def _file_table(self, info: lt.torrent_info, locale: LocaleManager) -> List[List]:
+        table = []
+        for file_idx in range(info.num_files()):
+            file_info = info.file_at(file_idx)
+            file_name = Path(file_info.path).name
+            match = locale.recognize(file_name)
+            table.append([
+                file_name, file_info.size, file_idx, match.code, match.category, _content_key(info, file_idx)
+            ])
+        return table
+    
+    def _resume_path(self, infohash: str) -> Path:
+        return self._resume / f"{infohash}.fastresume"
+    
+    def _read_resume(self, info) -> Optional[lt.add_torrent_params]:
+        path = self._resume_path(_infohash(info))
+        if not path.exists():
+            return None
+        try:
+            return lt.read_resume_data(path.read_bytes())
+        except Exception as e:
+            print(f"Error reading resume data: {e}")
+            return None
+    
+    def write_resume(self, params: lt.add_torrent_params) -> None:
+        path = self._resume_path(str(params.info_hashes.get_best()))
+        tmp = path.with_suffix('.tmp')
+        try:
+            tmp.write_bytes(lt.write_resume_data_buf(params))
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Error writing resume data: {e}")
+    
+    def downloaded_bytes(self, files: List[TorrentFile]) -> Dict[int, int]:
+        progress = [h.file_progress(flags=lt.torrent_handle.piece_granularity) for h in self.handles]
+        return {
+            f.global_idx: max(progress[c.handle_idx][c.file_idx] for c in [f] + self.copies.get(f.global_idx, []))
+            for f in files
+        }
+    
+    def resumed_files(self) -> List[TorrentFile]:
+        priorities = [h.get_file_priorities() for h in self.handles]
+        progress = [h.file_progress(flags=lt.torrent_handle.piece_granularity) for h in self.handles]
+        return [
+            self.logical(f) for f in self.files
+            if priorities[f.handle_idx][f.file_idx] > 0 and progress[f.handle_idx][f.file_idx] < f.size
+        ]
+    
+    @property
+    def logical_files(self) -> List[TorrentFile]:
+        return [f for f in self.files if f.duplicate_of is None]
+    
+    def logical(self, file: TorrentFile) -> TorrentFile:
+        return self.files[file.duplicate_of] if file.duplicate_of is not None else file
+    
+    def _availability(self, handle) -> Tuple[int, int, int]:
+        status = handle.status()
+        return status.num_seeds + max(status.num_complete, 0), status.list_seeds, status.list_peers
+    
+    def is_complete(self, file: TorrentFile) -> bool:
+        progress = self.handles[file.handle_idx].file_progress(flags=lt.torrent_handle.piece_granularity)
+        return progress[file.file_idx] >= file.size
+    
+    def best_copy(self, file: TorrentFile) -> TorrentFile:
+        copies = self.copies.get(file.global_idx)
+        if not copies:
+            return file
+        candidates = [file] + copies
+        for candidate in candidates:
+            if self.is_complete(candidate):
+                return candidate
+        availability = {c.handle_idx: self._availability(self.handles[c.handle_idx]) for c in candidates}
+        return max(candidates, key=lambda c: availability[c.handle_idx])
+    
+    def file_path(self, file: TorrentFile) -> Path:
+        info = self.handles[file.handle_idx].torrent_file()
+        return self._download / info.files().file_path(file.file_idx)
+    
+    def downloaded_path(self, file: TorrentFile) -> Optional[Path]:
+        scheduled = self._scheduled.get(file.global_idx)
+        candidates = [file] + self.copies.get(file.global_idx, [])
+        if scheduled is not None:
+            candidates.insert(0, scheduled)
+        for candidate in candidates:
+            if self.is_complete(candidate):
+                path = self.file_path(candidate)
+                if path.exists():
+                    return path
+        return None
+    
+    def start_download(self, selected_files: List[TorrentFile], window: Optional[int] = None) -> None:
+        selected_files = [self.best_copy(f) for f in selected_files]
+        self._scheduled = {self.logical(f).global_idx: f for f in selected_files}
+        priorities = self.scheduler.plan(selected_files, window)
+        completed = self.engine.track(selected_files)
+        for handle, handle_priorities in zip(self.handles, priorities):
+            handle.prioritize_files(handle_priorities)
             handle.force_reannounce(0, -1)
             handle.resume()
-        for _ in range(30):
-            if not self._active:
-                break
-            time.sleep(0.1)
-            if sum(h.status().num_peers for h in self.handles) > 0:
-                break
-    
-    def get_progress(self) -> Dict[int, int]:
-        progress = {}
-        idx = 0
-        for handle in self.handles:
-            for bytes_done in handle.file_progress():
-                progress[idx] = bytes_done
-                idx += 1
-        return progress
-    
-    def get_stats(self) -> Dict[str, int]:
-        peers = 0
-        download_rate = 0
-        for handle in self.handles:
-            status = handle.status()
-            peers += status.num_peers
-            download_rate += status.download_rate
-        return {'peers': peers, 'download_rate': download_rate}
+            if any(handle_priorities):
+                self._connect_known_peers(handle)
+        self.scheduler.start(completed)
+    
+    async def start_download_async(self, selected_files: List[TorrentFile], window: Optional[int] = None) -> asyncio.Future:
+        peers_found = self.engine.peers_found()
+        await asyncio.to_thread(self.start_download, selected_files, window)
+        return peers_found
     
     def stop(self) -> None:
-        self._active = False
+        self.engine.untrack()
+        self.scheduler.reset()
+        self._remember_peers()
         for handle in self.handles:
+            handle.unset_flags(lt.torrent_flags.auto_managed)
             handle.pause()
-            handle.prioritize_files([0] * handle.torrent_file().num_files())
+        self.engine.request_resume(self.handles, lt.torrent_handle.flush_disk_cache)
     
-    @property
-    def is_active(self) -> bool:
-        return self._active
+    def shutdown(self, timeout: float = 10.0) -> None:
+        if not self.session:
+            return
+        for handle in self.handles:
+            handle.pause()
+        self.engine.request_resume(self.handles, lt.torrent_handle.flush_disk_cache)
+        self.engine.wait_resume(timeout)
+        self.save_session_state()
+        self.engine.shutdown()
     
     @property
     def metadata(self) -> Dict:
@@ -150,6 +919,6 @@ class TorrentManager:
         first_info = self.handles[0].torrent_file()
         return {
             'name': first_info.name() if len(self.handles) == 1 else f"{len(self.handles)} torrents",
-            'total_files': len(self.files),
-            'total_size': sum(f.size for f in self.files)
+            'total_files': len(self.logical_files),
+            'total_size': sum(f.size for f in self.logical_files)
         }
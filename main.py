@@ -1,11 +1,13 @@
 import time
 import re
+import asyncio
 import os
 from pathlib import Path
-from nicegui import ui, app
-from libs.torrent import TorrentManager, TorrentFile
+from typing import List, Tuple
+from nicegui import ui, app, run, background_tasks
+from libs.torrent import TorrentManager, TorrentFile, ProgressEvent, FileScheduler
 from libs.locale import LocaleManager
-from libs.install import installer_mgr
+from libs.install import installer_mgr, InstallExecutor, InstallJob, InstallProgress
 from libs.unlock import unlocker_mgr
 from libs.utils import format_bytes, format_speed, format_eta
 import tkinter as tk
@@ -14,9 +16,17 @@ from tkinter import filedialog
 SOURCE_DIR = Path("source")
 DOWNLOAD_DIR = Path("downloads")
 LOCALES_FILE = Path(__file__).parent / "locales.json"
+PEER_WARMUP_TIMEOUT = 3.0
+DOWNLOAD_WINDOW = FileScheduler.AUTO
+TORRENT_PROFILE = 'balanced'
+AUTO_TUNE = False
+PROGRESSIVE_RENDER_DELAY = 0.3
+INSTALL_WORKERS = 2
+INSTALL_DISK_BUDGET = None
 
-locale = LocaleManager(LOCALES_FILE, language="en")
-torrent_mgr = TorrentManager(SOURCE_DIR, DOWNLOAD_DIR)
+locale = LocaleManager(LOCALES_FILE, language="en", cache_path=DOWNLOAD_DIR / ".match_cache.json")
+torrent_mgr = TorrentManager(SOURCE_DIR, DOWNLOAD_DIR, profile=TORRENT_PROFILE, auto_tune=AUTO_TUNE)
+install_executor = InstallExecutor(installer_mgr, workers=INSTALL_WORKERS)
 
 STATUS_NOT_INSTALLED = "not_installed"
 STATUS_INSTALLED = "installed"
@@ -27,14 +37,17 @@ STATUS_INSTALLING = "installing"
 class TorrentApp:
     def __init__(self):
         self.file_states = {}
-        self.timer = None
+        self.progress_task = None
+        self.root = None
+        self.render_scheduled = False
         self.is_loaded = False
+        self.pending = set()
         self.last_bytes = {}
-        self.last_time = time.time()
+        self.install_jobs = {}
+        self.install_queued = set()
         self.category_sort = {}
         self.game_path = None
         self.installed_dlc = set()
-        self.installed_mod_names = set()
         self.auto_install = True
         self.current_tab = 'download'
         self.header_container = None
@@ -56,7 +69,7 @@ class TorrentApp:
                 window.restoreScroll=function(){setTimeout(function(){const c=document.querySelector('.file-list-scroll');if(c&&window._scrollPos!==undefined)c.scrollTop=window._scrollPos;},10);}
             </script>
         ''')
-        with ui.element('div').classes('app-container'):
+        with ui.element('div').classes('app-container') as self.root:
             self._build_header()
             self._build_game_path_section()
             self._build_content()
@@ -154,12 +167,13 @@ class TorrentApp:
     
     def _on_game_path_change(self, e):
         path = e.value.strip()
+        if path != self.game_path:
+            self._cancel_installs()
         if not path:
             self._update_input_style(None)
             self.game_path = None
             installer_mgr.set_game_path("")
             self.installed_dlc.clear()
-            self.installed_mod_names.clear()
             if self.auto_install_switch:
                 self.auto_install_switch.disable()
             return
@@ -176,7 +190,6 @@ class TorrentApp:
             self.game_path = None
             installer_mgr.set_game_path("")
             self.installed_dlc.clear()
-            self.installed_mod_names.clear()
             self._update_input_style(False)
             if self.auto_install_switch:
                 self.auto_install_switch.disable()
@@ -198,11 +211,10 @@ class TorrentApp:
     def _is_dlc_installed(self, dlc_path: Path) -> bool:
         if not dlc_path.exists() or not dlc_path.is_dir():
             return False
-        return all((dlc_path / f).exists() for f in ["magalog.package", "thumbnails.package"])
+        return installer_mgr.is_installed(dlc_path)
     
     def _detect_installed_dlc(self):
         self.installed_dlc.clear()
-        self.installed_mod_names.clear()
         if not self.game_path or not os.path.exists(self.game_path):
             return
         delta_path = Path(self.game_path) / "Delta"
@@ -217,32 +229,14 @@ class TorrentApp:
                     if dlc_path.is_dir() and self._is_dlc_installed(dlc_path):
                         dlc_code = f"{match.group(1)}{match.group(2)}"
                         self.installed_dlc.add(dlc_code)
-                        for lang in ['pl', 'en']:
-                            mod_name = locale._mods.get(dlc_code, {}).get(lang, '')
-                            if mod_name:
-                                self.installed_mod_names.add(mod_name.lower())
         except Exception as e:
             print(f"Error: {e}")
     
-    def _get_dlc_code(self, filename: str) -> str:
-        filename_norm = filename.lower()
-        for code in locale._mods.keys():
-            if code.lower() in filename_norm:
-                return code.upper()
-        category = locale.get_mod_category(filename)
-        if category != 'OTHER':
-            mod_name = locale.get_mod_name(filename).lower()
-            for code, info in locale._mods.items():
-                if not code.startswith(category):
-                    continue
-                en_name = info.get('en', '').lower()
-                pl_name = info.get('pl', '').lower()
-                if mod_name in [en_name, pl_name] or en_name == mod_name or pl_name == mod_name:
-                    return code.upper()
-        return "—"
+    def _get_dlc_code(self, file: TorrentFile) -> str:
+        return file.dlc_code.upper() if file.dlc_code else "—"
     
     def _is_file_installed(self, file: TorrentFile) -> bool:
-        return (self.game_path and self.installed_mod_names and file.mod_name.lower().strip() in self.installed_mod_names)
+        return bool(self.game_path) and file.dlc_code in self.installed_dlc
     
     def _get_file_status(self, file: TorrentFile) -> str:
         if self._is_file_installed(file):
@@ -276,21 +270,10 @@ class TorrentApp:
             for name, state in self.file_states.items()
         }
     
-    def _update_mod_names(self):
-        for i, file in enumerate(torrent_mgr.files):
-            torrent_mgr.files[i] = TorrentFile(
-                name=file.name,
-                mod_name=locale.get_mod_name(file.name),
-                size=file.size,
-                handle_idx=file.handle_idx,
-                file_idx=file.file_idx,
-                global_idx=file.global_idx
-            )
-    
     def _group_files_by_category(self):
         categories = {'EP': [], 'GP': [], 'SP': [], 'FP': [], 'OTHER': []}
-        for file in torrent_mgr.files:
-            categories[locale.get_mod_category(file.name)].append(file)
+        for file in torrent_mgr.logical_files:
+            categories[file.category].append(file)
         return categories
     
     def _sort_category_files(self, files: list, category: str, sort_by: str):
@@ -298,7 +281,7 @@ class TorrentApp:
         if sort_by.startswith('size'):
             key = lambda f: f.size
         elif sort_by.startswith('id'):
-            key = lambda f: self._get_dlc_code(f.name)
+            key = lambda f: self._get_dlc_code(f)
         elif sort_by.startswith('installed'):
             has_installed = any(self._is_file_installed(f) for f in files)
             has_not_installed = any(not self._is_file_installed(f) for f in files)
@@ -408,9 +391,9 @@ class TorrentApp:
             with ui.element('div').classes('file-info'):
                 ui.label(file.name).classes('file-name')
                 ui.label(format_bytes(file.size)).classes('file-size')
-            dlc_code = self._get_dlc_code(file.name)
+            dlc_code = self._get_dlc_code(file)
             ui.label(dlc_code).classes('dlc-id')
-            ui.label(file.mod_name).classes('mod-name')
+            ui.label(locale.mod_name(file.dlc_code)).classes('mod-name')
             status_container = ui.element('div').classes('status-column')
             with status_container:
                 if status_type == STATUS_INSTALLED:
@@ -471,7 +454,7 @@ class TorrentApp:
                     self.auto_install_switch.disable()
     
     def _change_language(self, lang: str):
-        if self.timer and self.timer.active:
+        if self.is_downloading:
             ui.notify(locale.t("cannot_change_lang"), position="top-right", type="warning")
             return
         locale.set_language(lang)
@@ -479,9 +462,6 @@ class TorrentApp:
         self._render_game_path_section()  
         if self.current_tab == 'download':
             if self.is_loaded:
-                self._update_mod_names()
-                if self.game_path:
-                    self._detect_installed_dlc()
                 self._render_torrent_view()
             else:
                 self._render_empty_state()
@@ -565,26 +545,53 @@ class TorrentApp:
         ui.notify(message, type="positive" if success else "negative", position="top-right")
         self._render_unlocker_view()
     
-    def _load_torrent(self):
+    async def _load_torrent(self):
         torrents = list(SOURCE_DIR.glob("*.torrent"))
         if not torrents:
             ui.notify(locale.t("no_torrent"), position="top-right", type="warning")
             return
         torrent_mgr.init_session()
-        if not torrent_mgr.load_torrents(locale.get_mod_name):
+        self.is_loaded = False
+        self.btn_start.disable()
+        if self.game_path:
+            self._detect_installed_dlc()
+        loop = asyncio.get_running_loop()
+        loaded = await run.io_bound(torrent_mgr.load_torrents, locale, lambda batch: loop.call_soon_threadsafe(self._on_files_loaded))
+        if not loaded:
             ui.notify(locale.t("torrent_load_failed"), position="top-right", type="negative")
             return
         self.is_loaded = True
-        if self.game_path:
-            self._detect_installed_dlc()
         self._render_torrent_view()
+        for file in torrent_mgr.resumed_files():
+            state = self.file_states.get(file.name)
+            if state and not self._is_file_installed(file):
+                state['checkbox'].value = True
         self.btn_start.enable()
     
-    def _start_download(self):
+    def _on_files_loaded(self):
+        if self.is_loaded or self.render_scheduled:
+            return
+        self.render_scheduled = True
+        with self.root:
+            ui.timer(PROGRESSIVE_RENDER_DELAY, self._render_loading_view, once=True)
+    
+    def _render_loading_view(self):
+        self.render_scheduled = False
+        if not self.is_loaded and torrent_mgr.files:
+            self._render_torrent_view()
+    
+    async def _start_download(self):
         selected = [state['file'] for state in self.file_states.values() if state['checkbox'].value and not self._is_file_installed(state['file'])]
         if not selected:
             ui.notify(locale.t("no_files_selected"), position="top-right", type="warning")
             return
+        if self.auto_install and self.game_path:
+            downloaded = torrent_mgr.downloaded_bytes(selected)
+            plan = await run.io_bound(installer_mgr.plan_installs, [], selected, downloaded, DOWNLOAD_DIR,
+                                      None, INSTALL_DISK_BUDGET, install_executor.reserved)
+            if not plan.fits:
+                ui.notify(locale.t("not_enough_space", plan.reason), position="top-right", type="negative")
+                return
         self.btn_start.disable()
         self.btn_stop.enable()
         self._update_status_badge('downloading')
@@ -598,74 +605,88 @@ class TorrentApp:
                         with ui.element('div').classes('status-downloading'):
                             ui.icon('cloud_download', size='1rem')
                             ui.label(locale.t("downloading"))
-        torrent_mgr.start_download(selected)
-        self.last_bytes = {f.global_idx: 0 for f in selected}
-        self.last_time = time.time()
-        self.timer = ui.timer(0.25, self._update_progress)
-    
-    def _update_progress(self):
-        if not torrent_mgr.is_active:
-            self.timer.active = False
-            self._update_status_badge('ready')
-            self.btn_stop.disable()
-            self.btn_start.enable()
-            ui.notify(locale.t("download_cancelled"), position="top-right", type="warning")
-            return
-        
-        progress = torrent_mgr.get_progress()
-        stats = torrent_mgr.get_stats()
+        if self.summary_label:
+            self.summary_label.text = locale.t("connecting")
+        queue = torrent_mgr.engine.subscribe()
+        now = time.time()
+        self.pending = {f.global_idx for f in selected}
+        self.last_bytes = {f.global_idx: (0, now) for f in selected}
+        self.progress_task = background_tasks.create(self._consume_progress(queue))
+        peers_found = await torrent_mgr.start_download_async(selected, window=DOWNLOAD_WINDOW)
+        background_tasks.create(self._watch_peers(peers_found))
+    
+    async def _consume_progress(self, queue):
+        while True:
+            event = await queue.get()
+            if event is None:
+                break
+            with self.root:
+                self._update_progress(event)
+            if not self.pending:
+                break
+    
+    async def _watch_peers(self, peers_found):
+        try:
+            peers = await asyncio.wait_for(asyncio.shield(peers_found), timeout=PEER_WARMUP_TIMEOUT)
+        except asyncio.TimeoutError:
+            with self.root:
+                ui.notify(locale.t("no_peers"), position="top-right", type="warning")
+            peers = await peers_found
+        if peers:
+            with self.root:
+                ui.notify(locale.t("peers_found", peers), position="top-right", type="positive")
+    
+    @property
+    def is_downloading(self) -> bool:
+        return self.progress_task is not None and not self.progress_task.done()
+    
+    def _update_progress(self, event: ProgressEvent):
         now = time.time()
-        dt = now - self.last_time
-        self.last_time = now
-        all_done = True
-        total_progress = 0
-        selected_count = 0
         completed_files = []
+        completed = set(event.completed)
         
-        for state in self.file_states.values():
-            if not state['checkbox'].value or self._is_file_installed(state['file']):
+        for global_idx in event.progress.keys() | completed:
+            file = torrent_mgr.files[global_idx]
+            state = self.file_states.get(file.name)
+            if not state or self._is_file_installed(file):
                 continue
-            selected_count += 1
-            file = state['file']
-            done = progress.get(file.global_idx, 0)
             total = file.size
-            ratio = done / total if total > 0 else 0
+            finished = global_idx in completed
+            done = total if finished else min(event.progress[global_idx], total)
+            ratio = 1.0 if finished else (done / total if total > 0 else 0)
             state['progress'] = ratio
             if state['progress_fill']:
                 state['progress_fill'].style(f"width: {ratio * 100}%")
-            total_progress += ratio
-            if ratio >= 1:
+            if finished:
+                self.pending.discard(global_idx)
                 if state['status_type'] == STATUS_DOWNLOADING:
                     completed_files.append(file)
-                    state['status_type'] = STATUS_INSTALLING
-                    if state.get('status_container'):
-                        state['status_container'].clear()
-                        with state['status_container']:
-                            with ui.element('div').classes('status-installing'):
-                                ui.icon('install_desktop', size='1rem')
-                                ui.label(locale.t("installing"))
-            else:
-                all_done = False
+                    self._set_row_status(state, STATUS_INSTALLING)
             if state['status']:
-                if ratio >= 1:
+                if finished:
                     state['status'].text = locale.t("completed")
                     state['status'].style('color: var(--green-400)')
                 else:
-                    delta = done - self.last_bytes.get(file.global_idx, 0)
-                    self.last_bytes[file.global_idx] = done
-                    speed = delta / dt if dt > 0 else 0
+                    last_done, last_time = self.last_bytes.get(global_idx, (0, now))
+                    self.last_bytes[global_idx] = (done, now)
+                    dt = now - last_time
+                    speed = (done - last_done) / dt if dt > 0 else 0
                     eta = (total - done) / speed if speed > 0 else float("inf")
                     state['status'].text = f"{format_bytes(done)}/{format_bytes(total)} • {format_speed(speed)} • {format_eta(eta)}"
         
-        overall = int((total_progress / selected_count) * 100) if selected_count else 0
-        peer_text = f" | {stats['peers']} peers" if stats['peers'] > 0 else " | No peers"
+        selected = [state for state in self.file_states.values() if state['checkbox'].value and not self._is_file_installed(state['file'])]
+        selected_count = len(selected)
+        overall = int((sum(state['progress'] for state in selected) / selected_count) * 100) if selected_count else 0
+        if torrent_mgr.engine.connecting:
+            peer_text = f" | {locale.t('connecting')}"
+        else:
+            peer_text = f" | {event.peers} peers" if event.peers > 0 else " | No peers"
         self.summary_label.text = f"📥 {locale.t('downloading')}: {overall}% ({selected_count} {locale.t('files')}{peer_text})"
         
         if completed_files and self.auto_install and self.game_path:
-            ui.timer(0.1, lambda: self._install_completed_files(completed_files), once=True)
+            self._queue_installs(completed_files)
         
-        if all_done:
-            self.timer.active = False
+        if not self.pending:
             torrent_mgr.stop()
             self._update_status_badge('ready')
             for state in self.file_states.values():
@@ -675,95 +696,143 @@ class TorrentApp:
             self.btn_start.enable()
             ui.notify(locale.t("all_downloaded"), position="top-right", type="positive")
     
-    def _install_completed_files(self, files: list):
-        if not self.game_path:
+    def _on_install_progress(self, file: TorrentFile, progress: InstallProgress):
+        state = self.file_states.get(file.name)
+        if state and state.get('status') and progress.total:
+            text = f"{locale.t('installing')} {progress.done * 100 // progress.total}%"
+            if progress.rate:
+                text += f" • {format_speed(progress.rate)} • {format_eta(progress.eta)}"
+            state['status'].text = text
+    
+    def _set_row_status(self, state: dict, status_type: str):
+        state['status_type'] = status_type
+        container = state.get('status_container')
+        if not container:
             return
-        if self.summary_label:
-            self.summary_label.text = locale.t("installing_dlcs", len(files))
-        installed_any = False
-        files_to_delete = []
-        for file in files:
-            file_path = None
-            direct_path = DOWNLOAD_DIR / file.name
-            if direct_path.exists():
-                file_path = direct_path
+        container.clear()
+        with container:
+            if status_type == STATUS_INSTALLED:
+                with ui.element('div').classes('status-installed'):
+                    ui.icon('check_circle', size='1rem')
+                    ui.label(locale.t("installed"))
+            elif status_type == STATUS_INSTALLING:
+                with ui.element('div').classes('status-installing'):
+                    ui.icon('install_desktop', size='1rem')
+                    ui.label(locale.t("installing"))
             else:
-                for found in DOWNLOAD_DIR.rglob(file.name):
-                    if found.is_file():
-                        file_path = found
-                        break
-            if file_path and file_path.exists():
-                success, msg, dlc_codes = installer_mgr.install_file(file_path, delete_after=True)
-                if success and dlc_codes:
-                    self.installed_dlc.update(dlc_codes)
-                    for dlc_code in dlc_codes:
-                        for lang in ['pl', 'en']:
-                            mod_name = locale._mods.get(dlc_code, {}).get(lang, '')
-                            if mod_name:
-                                self.installed_mod_names.add(mod_name.lower())
-                    installed_any = True
-                    if file.name in self.file_states:
-                        state = self.file_states[file.name]
-                        state['status_type'] = STATUS_INSTALLED
-                        if state.get('status_container'):
-                            state['status_container'].clear()
-                            with state['status_container']:
-                                with ui.element('div').classes('status-installed'):
-                                    ui.icon('check_circle', size='1rem')
-                                    ui.label(locale.t("installed"))
-                    ui.notify(locale.t("dlc_installed", file.mod_name, msg), type="positive", position="top-right")
-                    if file_path.exists():
-                        files_to_delete.append(file_path)
-                elif not success:
-                    if file.name in self.file_states:
-                        state = self.file_states[file.name]
-                        state['status_type'] = STATUS_NOT_INSTALLED
-                        if state.get('status_container'):
-                            state['status_container'].clear()
-                            with state['status_container']:
-                                with ui.element('div').classes('status-not-installed'):
-                                    ui.label(locale.t("not_installed"))
-                    ui.notify(locale.t("dlc_install_failed", file.mod_name, msg), type="negative", position="top-right")
-            else:
-                if file.name in self.file_states:
-                    state = self.file_states[file.name]
-                    state['status_type'] = STATUS_NOT_INSTALLED
-                    if state.get('status_container'):
-                        state['status_container'].clear()
-                        with state['status_container']:
-                            with ui.element('div').classes('status-not-installed'):
-                                ui.label(locale.t("not_installed"))
-                ui.notify(locale.t("file_not_found", file.mod_name), type="negative", position="top-right")
-        
-        if files_to_delete:
-            import gc
-            import time
-            gc.collect()
-            time.sleep(1)
-            for file_path in files_to_delete:
-                try:
-                    if file_path.exists():
-                        file_path.unlink()
-                except Exception:
-                    pass
-        
-        if installed_any:
-            self._detect_installed_dlc()
-        if self.is_loaded:
-            self._render_torrent_view()
-        if self.summary_label:
+                with ui.element('div').classes('status-not-installed'):
+                    ui.label(locale.t("not_installed"))
+    
+    def _mark_rows_installed(self):
+        for state in self.file_states.values():
+            if state['status_type'] != STATUS_INSTALLED and self._is_file_installed(state['file']):
+                self._mark_row_installed(state)
+    
+    def _mark_row_installed(self, state: dict):
+        self._set_row_status(state, STATUS_INSTALLED)
+        state['checkbox'].value = False
+        state['checkbox'].disable()
+        state['checked'] = False
+        state['progress'] = 1.0
+        if state['progress_fill']:
+            state['progress_fill'].style("width: 100%")
+        if state['status']:
+            state['status'].text = '—'
+            state['status'].style(remove='color: var(--green-400)')
+    
+    def _update_install_summary(self):
+        if not self.summary_label or self.is_downloading:
+            return
+        if self.install_jobs:
+            self.summary_label.text = locale.t("installing_dlcs", len(self.install_jobs))
+        else:
             self.summary_label.text = locale.t("ready_to_download")
     
+    def _queue_installs(self, files: List[TorrentFile]):
+        ready = []
+        for file in files:
+            if not self.game_path or file.name in self.install_jobs or file.name in self.install_queued:
+                continue
+            state = self.file_states.get(file.name)
+            file_path = torrent_mgr.downloaded_path(file)
+            if not file_path:
+                if state:
+                    self._set_row_status(state, STATUS_NOT_INSTALLED)
+                ui.notify(locale.t("file_not_found", locale.mod_name(file.dlc_code)), type="negative", position="top-right")
+                continue
+            if state:
+                self._set_row_status(state, STATUS_INSTALLING)
+            self.install_queued.add(file.name)
+            ready.append((file, file_path))
+        if ready:
+            background_tasks.create(self._submit_installs(ready))
+    
+    async def _submit_installs(self, ready: List[Tuple[TorrentFile, Path]]):
+        plan = await run.io_bound(installer_mgr.plan_installs, ready, budget=INSTALL_DISK_BUDGET)
+        loop = asyncio.get_running_loop()
+        names = {file.name for file, _ in ready}
+        if not names <= self.install_queued:
+            self.install_queued -= names
+            with self.root:
+                for name in names:
+                    state = self.file_states.get(name)
+                    if state and state['status_type'] == STATUS_INSTALLING:
+                        self._set_row_status(state, STATUS_NOT_INSTALLED)
+            return
+        self.install_queued -= names
+        jobs = install_executor.submit_plan(
+            plan, delete_after=True,
+            on_progress=lambda file, progress: loop.call_soon_threadsafe(self._on_install_progress, file, progress),
+            check=lambda step, reserved: installer_mgr.plan_installs([(step.file, step.path)], budget=INSTALL_DISK_BUDGET,
+                                                                     reserved=reserved)
+        )
+        for file, job in jobs:
+            self.install_jobs[file.name] = job
+            background_tasks.create(self._await_install(file, job))
+        with self.root:
+            self._update_install_summary()
+    
+    async def _await_install(self, file: TorrentFile, job: InstallJob):
+        try:
+            success, msg, dlc_codes = await asyncio.wrap_future(job.future)
+        except asyncio.CancelledError:
+            success, msg, dlc_codes = False, "Cancelled", []
+        except Exception as e:
+            success, msg, dlc_codes = False, str(e), []
+        if self.install_jobs.get(file.name) is job:
+            del self.install_jobs[file.name]
+        
+        with self.root:
+            state = self.file_states.get(file.name)
+            if success:
+                self.installed_dlc.update(dlc_codes)
+                if state:
+                    self._mark_row_installed(state)
+                self._mark_rows_installed()
+                ui.notify(locale.t("dlc_installed", locale.mod_name(file.dlc_code), msg), type="positive", position="top-right")
+            else:
+                if state:
+                    self._set_row_status(state, STATUS_NOT_INSTALLED)
+                    if state['status']:
+                        state['status'].text = locale.t("waiting")
+                if not job.cancelled.is_set():
+                    ui.notify(locale.t("dlc_install_failed", locale.mod_name(file.dlc_code), msg), type="negative", position="top-right")
+            self._update_install_summary()
+    
+    def _cancel_installs(self):
+        self.install_queued.clear()
+        for job in self.install_jobs.values():
+            job.cancel()
+    
     def _stop_download(self):
         torrent_mgr.stop()
-        if self.timer:
-            self.timer.active = False
         for state in self.file_states.values():
             if state.get('status_type') == STATUS_DOWNLOADING:
                 state['status_type'] = STATUS_NOT_INSTALLED
         self._update_status_badge('ready')
         self.btn_stop.disable()
         self.btn_start.enable()
+        ui.notify(locale.t("download_cancelled"), position="top-right", type="warning")
     
     def _update_status_badge(self, status: str):
         if not self.status_badge:
@@ -789,4 +858,7 @@ def index():
 if __name__ in {"__main__", "__mp_main__"}:
     app.add_static_files('/static', str(Path(__file__).parent))
     app.on_disconnect(lambda: app.shutdown())
+    app.on_shutdown(torrent_mgr.shutdown)
+    app.on_shutdown(locale.save_matches)
+    app.on_shutdown(lambda: install_executor.shutdown(wait=False))
     ui.run(title="Downloader", port=8080, dark=True, native=True, reload=True)